@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+FACTIONS = ["Red", "Blue", "Green"]
+
+def kingdom_export(players: int, report: int = 1, seed: int = 0, renamed: float = 0.02, migrants: float = 0.05) -> pd.DataFrame:
+    # ids and names are stable across reports, so later reports merge onto earlier ones
+    base = np.random.default_rng(seed)
+    lord_ids = base.choice(np.arange(10_000_000, 99_999_999), size=players, replace=False)
+    names = np.array([f"Plàyer {i} {'ÁÉÖ'[i % 3]}" for i in range(players)], dtype=object)
+    alliances = base.integers(1, max(players // 100, 2), size=players)
+
+    rng = np.random.default_rng((seed, report))
+    if report > 1:
+        moved = rng.random(players) < migrants
+        lord_ids = lord_ids.copy()
+        lord_ids[moved] = rng.choice(np.arange(100_000_000, 199_999_999), size=int(moved.sum()), replace=False)
+        renames = rng.random(players) < renamed
+        names = names.copy()
+        names[renames] = [f"{name} r{report}" for name in names[renames]]
+
+    growth = 1 + 0.1 * (report - 1)
+    kills = rng.integers(0, 2_000_000, size=(players, 5)) * report
+    return pd.DataFrame({
+        "Lord ID": lord_ids,
+        "Name": names,
+        "Alliance ID": alliances,
+        "Alliance Tag": [f"A{a}" for a in alliances],
+        "Faction": [FACTIONS[a % 3] for a in alliances],
+        "Division": (alliances % 4 + 1).astype(str),
+        "Power": (base.integers(1_000_000, 120_000_000, size=players) * growth).astype("int64"),
+        "Merits": rng.integers(0, 5_000_000, size=players) * report,
+        "Units Killed": kills.sum(axis=1),
+        "Units Dead": rng.integers(0, 1_000_000, size=players) * report,
+        "T1 Kill Count": kills[:, 0],
+        "T2 Kill Count": kills[:, 1],
+        "T3 Kill Count": kills[:, 2],
+        "T4 Kill Count": kills[:, 3],
+        "T5 Kill Count": kills[:, 4],
+        "Home Server": base.integers(1, 400, size=players),
+    })
@@ -0,0 +1,141 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "test"))
+sys.path.insert(0, BENCH_DIR)
+
+GUILD_ID = 1
+REGRESSION_RATIO = 1.25
+
+def measure(results: dict, step: str, func, *args):
+    # tracemalloc slows Python-heavy code a lot, so peaks come from a separate pass
+    if results["trace"]:
+        tracemalloc.start()
+        value = func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[step] = round(peak / 1024 / 1024, 2)
+    else:
+        start = time.perf_counter()
+        value = func(*args)
+        results[step] = round(time.perf_counter() - start, 4)
+    return value
+
+def run_case(players: int, reports: int, trace: bool) -> dict:
+    import database
+    from generator import kingdom_export
+    from leaderboard import get_leaderboards, leaderboard_cache
+    from search import get_name_index, index_cache
+
+    tables = [f"{table}_{GUILD_ID}{suffix}" for table in ("guild", "names", "reports") for suffix in ("", "_old")]
+    with database.ddl_transaction(*tables) as conn:
+        for table in tables:
+            conn.exec_driver_sql(f"DROP TABLE IF EXISTS {table}")
+    database.bump_version(GUILD_ID)
+
+    results = {"trace": trace}
+    for report in range(1, reports + 1):
+        export = kingdom_export(players, report)
+        if report == 1:
+            measure(results, "save_table", database.save_table, export, GUILD_ID, True)
+        else:
+            measure(results, f"save_file_to_db.{report}", database.save_file_to_db, export, GUILD_ID)
+
+    database.snapshot_cache.clear()
+    _, df = measure(results, "load_players", database.load_players, GUILD_ID)
+    measure(results, "load_players.cached", database.load_players, GUILD_ID)
+
+    renamed = df[["lord_id", "name"]].copy()
+    renamed.loc[renamed.index[::50], "name"] = renamed["name"] + " x"
+    measure(results, "update_global_names", database.update_global_names, GUILD_ID, renamed)
+
+    leaderboard_cache.clear()
+    measure(results, "rating", lambda: get_leaderboards(GUILD_ID).get("Units Killed").top(20))
+    measure(results, "rating.cached", lambda: get_leaderboards(GUILD_ID).get("Units Killed").top(20))
+
+    # every 50th player was just renamed, so look up one whose name is still current
+    middle = len(df) // 2 + 1
+    lord_id = int(df["lord_id"].iloc[middle])
+    name = df["name"].iloc[middle]
+    measure(results, "stats", lambda: (database.find_player(GUILD_ID, name=name), database.load_player_reports(GUILD_ID, lord_id)))
+
+    index_cache.clear()
+    index = measure(results, "autocomplete.build", get_name_index, GUILD_ID)
+    measure(results, "autocomplete.query", lambda: [index.search(q) for q in ("pla", "yer 1", "áé", "zzz")])
+    del results["trace"]
+    return results
+
+def compare(baseline: dict, current: dict) -> list[str]:
+    regressions = []
+    for case, steps in current["results"].items():
+        for step, value in steps.items():
+            old = baseline.get("results", {}).get(case, {}).get(step)
+            if not old or old["seconds"] < 0.01:
+                continue
+            ratio = value["seconds"] / old["seconds"]
+            if ratio > REGRESSION_RATIO:
+                regressions.append(f"{case} {step}: {old['seconds']}s -> {value['seconds']}s ({ratio:.2f}x)")
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the ingest and query paths")
+    parser.add_argument("--players", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--reports", type=int, default=3)
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL"))
+    parser.add_argument("--output", default=os.path.join(BENCH_DIR, "baseline.json"))
+    parser.add_argument("--compare", help="baseline file to check for regressions")
+    args = parser.parse_args()
+
+    db_file = None
+    if not args.database_url:
+        db_file = tempfile.NamedTemporaryFile(suffix=".sqlite", delete=False)
+        args.database_url = f"sqlite:///{db_file.name}"
+    os.environ["DATABASE_URL"] = args.database_url
+
+    import pandas as pd
+    import database
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "dialect": database.engine.dialect.name,
+            "reports": args.reports,
+        },
+        "results": {},
+    }
+    try:
+        for players in args.players:
+            case = f"{players}x{args.reports}"
+            seconds = run_case(players, args.reports, trace=False)
+            peaks = run_case(players, args.reports, trace=True)
+            report["results"][case] = {
+                step: {"seconds": seconds[step], "peak_mb": peaks[step]} for step in seconds
+            }
+            for step, value in report["results"][case].items():
+                print(f"{case:>12} {step:<22} {value['seconds']:>9.4f}s {value['peak_mb']:>9.2f} MB")
+    finally:
+        if db_file is not None:
+            database.engine.dispose()
+            os.remove(db_file.name)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
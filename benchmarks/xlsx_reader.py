@@ -0,0 +1,46 @@
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "test"))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from ingest import read_xlsx
+
+COLUMNS = ["Lord ID", "Name", "Alliance ID", "Alliance Tag", "Faction", "Division", "Power", "Merits",
+           "Units Killed", "Units Dead", "T1 Kill Count", "T2 Kill Count", "T3 Kill Count",
+           "T4 Kill Count", "T5 Kill Count"]
+
+def make_workbook(rows: int, seed: int = 0) -> bytes:
+    rng = np.random.default_rng(seed)
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(COLUMNS)
+    numbers = rng.integers(0, 100_000_000, size=(rows, 9)).tolist()
+    for i in range(rows):
+        sheet.append([i + 1, f"Player {i}", i % 50, f"A{i % 50}", "Red", "1", *numbers[i]])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+def timed(func, data: bytes) -> tuple[float, pd.DataFrame]:
+    start = time.perf_counter()
+    df = func(io.BytesIO(data))
+    return time.perf_counter() - start, df
+
+def main(sizes: list[int]) -> None:
+    print(f"{'rows':>8} {'openpyxl':>10} {'read_xlsx':>10} {'speedup':>8}")
+    for rows in sizes:
+        data = make_workbook(rows)
+        base, expected = timed(lambda buf: pd.read_excel(buf, engine="openpyxl"), data)
+        fast, actual = timed(read_xlsx, data)
+        # pandas re-infers numeric-looking text cells, so compare rendered values
+        pd.testing.assert_frame_equal(expected.astype(str), actual.astype(str))
+        print(f"{rows:>8} {base:>9.2f}s {fast:>9.2f}s {base / fast:>7.1f}x")
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10_000, 50_000, 100_000])
@@ -1,37 +1,69 @@
 import hikari
-from hikari.api import special_endpoints
-from lightbulb.components import base
 import lightbulb
-import pandas as pd
-import os
 import asyncio
-import time
+import tempfile
 from config import *
-from unidecode import unidecode
-from sqlalchemy.orm import Session
-from sqlalchemy import create_engine, text
 from utils import fmt, visual_len, nickname_autocomplete, category_autocomplete
-from database import table_exists, clean_dataframe, save_table, save_file_to_db, load_players, load_previous_kvk, delete_player, engine, clear_guild_data
-from flask import Flask
-from threading import Thread
-
-app = Flask('')
-
-@app.route('/')
-def home():
-    return "Bot is alive"
-
-def run():
-    app.run(host='0.0.0.0', port=8080)
-
-def keep_alive():
-    Thread(target=run).start()
-
-keep_alive()
+from database import table_exists, save_table, save_file_to_db, delete_player, clear_guild_data
+from database import load_player_reports, find_player, migrate_name_keys, warm_up, bus
+from leaderboard import CATEGORIES, RATING_PAGE_SIZE, get_leaderboards, leaderboard_cache
+from seasons import MIN_POWER, compare_seasons
+from exports import EXPORT_FORMATS, DUMP_FORMATS, NO_REPORTS, batch_parts, build_merits_list, dump_tables, export_cache
+from executor import run_blocking, run_read, run_snapshot_read, run_write, shutdown
+from ingest import SUPPORTED_EXTENSIONS, unknown_columns_note
+from jobs import STAGES, ingest_queue
+from metrics import instrumented
+from health import HealthServer
 
 bot = hikari.GatewayBot(DISCORD_TOKEN)
 client = lightbulb.client_from_app(bot)
 bot.subscribe(hikari.StartingEvent, client.start)
+health_server = HealthServer(bot, HEALTH_HOST, HEALTH_PORT)
+
+# started before the gateway connects so the host's liveness probe passes while
+# /ready still reports the real state
+@bot.listen(hikari.StartingEvent)
+async def on_starting(event: hikari.StartingEvent) -> None:
+    ingest_queue.start()
+    bus.start()
+    await run_blocking(migrate_name_keys)
+    await run_blocking(warm_up)
+    # the probes are optional, a busy port must not keep the bot from serving commands
+    try:
+        await health_server.start()
+    except OSError as e:
+        print(f"Health server could not listen on {HEALTH_HOST}:{HEALTH_PORT}: {e}")
+
+@bot.listen(hikari.StoppingEvent)
+async def on_stopping(event: hikari.StoppingEvent) -> None:
+    await ingest_queue.stop()
+    await health_server.stop()
+
+@bot.listen(hikari.StoppedEvent)
+async def on_stopped(event: hikari.StoppedEvent) -> None:
+    await run_blocking(bus.stop)
+    shutdown()
+
+async def ingest_upload(ctx: lightbulb.Context, guild_file: hikari.Attachment, save, *args):
+    message = await ctx.respond(STAGES["download"], ephemeral=True)
+    if not guild_file.filename.endswith(SUPPORTED_EXTENSIONS):
+        await ctx.edit_response(message, "Need csv or excel file!")
+        return message, None, None
+
+    async def report(stage: str) -> None:
+        await ctx.edit_response(message, STAGES[stage])
+
+    try:
+        df, result = await ingest_queue.submit(ctx.guild_id, guild_file, save, *args, report=report)
+    except Exception as e:
+        await ctx.edit_response(message, f"❌ Processing error: {e}")
+        return message, None, None
+    # the upload is saved at this point, a cold rating only costs the next /rating
+    try:
+        await run_snapshot_read(ctx.guild_id, leaderboard_cache, get_leaderboards, ctx.guild_id)
+    except Exception as e:
+        print(f"Warming the rating for guild {ctx.guild_id} failed: {e}")
+    return message, df, result
 
 class ConfirmationMenu(lightbulb.components.Menu):
     def __init__(self, member: hikari.Member) -> None:
@@ -49,6 +81,48 @@ class ConfirmationMenu(lightbulb.components.Menu):
         self.confirmed = True
         ctx.stop_interacting()
 
+class RatingMenu(lightbulb.components.Menu):
+    def __init__(self, board, title: str, page: int = 0, highlight: int | None = None) -> None:
+        super().__init__()
+        self.board = board
+        self.title = title
+        self.page = page
+        self.highlight = highlight
+        self.prev = self.add_interactive_button(hikari.ButtonStyle.SECONDARY, self.on_prev, label="◀ Prev")
+        self.next = self.add_interactive_button(hikari.ButtonStyle.SECONDARY, self.on_next, label="Next ▶")
+        self.sync_buttons()
+
+    def sync_buttons(self) -> None:
+        self.prev.disabled = self.page <= 0
+        self.next.disabled = self.page >= self.board.pages(RATING_PAGE_SIZE) - 1
+
+    def render(self) -> str:
+        lines = []
+        for place, name, value in self.board.page(self.page, RATING_PAGE_SIZE):
+            line = f"{place}. **{name}** — {fmt(value)}"
+            lines.append(f"👉 {line}" if place - 1 == self.highlight else line)
+        return (
+            f"🏆 **{self.title}** 🏆\n\n" + "\n".join(lines)
+            + f"\n\nPage {self.page + 1}/{self.board.pages(RATING_PAGE_SIZE)}"
+        )
+
+    async def on_prev(self, ctx: lightbulb.components.MenuContext) -> None:
+        self.page = max(self.page - 1, 0)
+        self.sync_buttons()
+        await ctx.respond(self.render(), edit=True, rebuild_menu=True)
+
+    async def on_next(self, ctx: lightbulb.components.MenuContext) -> None:
+        self.page = min(self.page + 1, self.board.pages(RATING_PAGE_SIZE) - 1)
+        self.sync_buttons()
+        await ctx.respond(self.render(), edit=True, rebuild_menu=True)
+
+async def show_rating(ctx: lightbulb.Context, menu: RatingMenu) -> None:
+    resp = await ctx.respond(menu.render(), components=menu, ephemeral=True)
+    try:
+        await menu.attach(client, timeout=120)
+    except asyncio.TimeoutError:
+        await ctx.edit_response(resp, components=[])
+
 
 @client.register()
 class clear_data(
@@ -58,6 +132,7 @@ class clear_data(
     default_member_permissions=hikari.Permissions.ADMINISTRATOR,
 ):
     @lightbulb.invoke
+    @instrumented
     async def invoke(self, ctx: lightbulb.Context) -> None:
         guild_id = ctx.guild_id
         confirm_menu = ConfirmationMenu(ctx.member)
@@ -73,7 +148,7 @@ class clear_data(
             await ctx.respond("Cancelled", ephemeral=True)
             return
         
-        success = clear_guild_data(guild_id)
+        success = await run_write(guild_id, clear_guild_data, guild_id)
         if success:
             await ctx.respond(f"✅ Data cleared", ephemeral=True)
         else:
@@ -90,39 +165,14 @@ class add_new_file(
 
     file = lightbulb.attachment("file", "Upload CSV or Excel file")
     @lightbulb.invoke
+    @instrumented
     async def invoke(self, ctx: lightbulb.Context) -> None:
-        guild_id = ctx.guild_id
         guild_file: hikari.Attachment = self.file
 
-        message = await ctx.respond("⏳ Downloading file...", ephemeral=True)
-        try:
-            if not guild_file.filename.endswith((".csv", ".xlsx", ".xls")):
-                await ctx.respond("Need csv or excel file!", ephemeral=True)
-                return
+        message, df, _ = await ingest_upload(ctx, guild_file, save_table, True)
+        if df is not None:
+            await ctx.edit_response(message, "✅ Table replaced and old table archived successfully!" + unknown_columns_note(df))
 
-            temp_path = f"tmp/{guild_id}_{int(time.time())}_{guild_file.filename}"
-            os.makedirs("tmp", exist_ok=True)
-
-            await guild_file.save(temp_path, force=True)
-            if guild_file.filename.endswith(".xls"):
-                xlsx_path = temp_path + "x"
-                df_convert = pd.read_excel(temp_path, engine="xlrd")
-                df_convert.to_excel(xlsx_path, index=False)
-                temp_path = xlsx_path
-            if guild_file.filename.endswith(".csv"):
-                df = pd.read_csv(temp_path, sep=";", encoding="utf-8")
-            else:
-                df = pd.read_excel(temp_path, engine="openpyxl")
-
-            save_table(df, guild_id, True)
-            await ctx.edit_response(message, "✅ Table replaced and old table archived successfully!")
-        except Exception as e:
-            await ctx.edit_response(message, f"❌ Processing error: {e}")
-
-        finally:
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-            
 @client.register()
 class change_new_file(
     lightbulb.SlashCommand,
@@ -133,37 +183,14 @@ class change_new_file(
     
     file = lightbulb.attachment("file", "Upload CSV or Excel file")
     @lightbulb.invoke
+    @instrumented
     async def invoke(self, ctx: lightbulb.Context) -> None:
-        guild_id = ctx.guild_id
         guild_file: hikari.Attachment = self.file
 
-        message = await ctx.respond("⏳ Downloading file...", ephemeral=True)
-        try:
-            if not guild_file.filename.endswith((".csv", ".xlsx", ".xls")):
-                await ctx.respond("Need csv or excel file!", ephemeral=True)
-                return
-            temp_path = f"tmp/{guild_id}_{int(time.time())}_{guild_file.filename}"
-            os.makedirs("tmp", exist_ok=True)
-            await guild_file.save(temp_path, force=True)
-            if guild_file.filename.endswith(".xls"):
-                xlsx_path = temp_path + "x"
-                df_convert = pd.read_excel(temp_path, engine="xlrd")
-                df_convert.to_excel(xlsx_path, index=False)
-                temp_path = xlsx_path
-            if guild_file.filename.endswith(".csv"):
-                df = pd.read_csv(temp_path, sep=";", encoding="utf-8")
-            else:
-                df = pd.read_excel(temp_path, engine="openpyxl")
-
-            save_table(df, guild_id, False)
-            await ctx.edit_response(message, "✅ Table replaced successfully!")
-        except Exception as e:
-            await ctx.edit_response(message, f"❌ Processing error: {e}")
+        message, df, _ = await ingest_upload(ctx, guild_file, save_table, False)
+        if df is not None:
+            await ctx.edit_response(message, "✅ Table replaced successfully!" + unknown_columns_note(df))
 
-        finally:
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-        
 @client.register()
 class add_report(
     lightbulb.SlashCommand,
@@ -174,40 +201,17 @@ class add_report(
     
     file = lightbulb.attachment("file", "Upload CSV or Excel file")
     @lightbulb.invoke
+    @instrumented
     async def invoke(self, ctx: lightbulb.Context) -> None:
-        guild_id = ctx.guild_id
         guild_file: hikari.Attachment = self.file
 
-        message = await ctx.respond("⏳ Downloading file...", ephemeral=True)
-        try:
-            if not guild_file.filename.endswith((".csv", ".xlsx", ".xls")):
-                await ctx.respond("Need csv or excel file!", ephemeral=True)
-                return
-            
-            temp_path = f"tmp/{guild_id}_{int(time.time())}_{guild_file.filename}"
-            os.makedirs("tmp", exist_ok=True)
-            await guild_file.save(temp_path, force=True)
-            if guild_file.filename.endswith(".xls"):
-                xlsx_path = temp_path + "x"
-                df_convert = pd.read_excel(temp_path, engine="xlrd")
-                df_convert.to_excel(xlsx_path, index=False)
-                temp_path = xlsx_path
-            if guild_file.filename.endswith(".csv"):
-                df = pd.read_csv(temp_path, sep=";", encoding="utf-8")
-            else:  # xlsx
-                df = pd.read_excel(temp_path, engine="openpyxl")
-            success = save_file_to_db(df, guild_id)
-            if success:
-                await ctx.edit_response(message, "✅ File saved!")
-            else:
-                await ctx.edit_response(message, "❌ You have already added 3 reports!")
-
-        except Exception as e:
-            await ctx.edit_response(message, f"❌ Processing error: {e}")
-
-        finally:
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
+        message, df, success = await ingest_upload(ctx, guild_file, save_file_to_db)
+        if df is None:
+            return
+        if success:
+            await ctx.edit_response(message, "✅ File saved!" + unknown_columns_note(df))
+        else:
+            await ctx.edit_response(message, "❌ Report could not be saved!")
 
 
 @client.register()
@@ -222,34 +226,28 @@ class stats(
     player_id = lightbulb.integer("id", "Player ID", default="")
 
     @lightbulb.invoke
+    @instrumented
     async def invoke(self, ctx: lightbulb.Context) -> None:
         guild_id = ctx.guild_id
         await ctx.defer(ephemeral=True)
 
-        if not table_exists(f"guild_{guild_id}"):
+        if not await run_blocking(table_exists, f"guild_{guild_id}"):
             await ctx.respond("No table loaded", ephemeral=True)
             return
         
-        _, df = load_players(guild_id)
-        
         nickname = self.name
         player_id = self.player_id
 
-        player = None
-
         if nickname:
-            player = df.loc[df["name"].str.lower() == nickname.lower()]
-        elif player_id:
-            player = df.loc[df["lord_id"] == player_id]
+            row = await run_read(guild_id, find_player, guild_id, name=nickname)
+        else:
+            row = await run_read(guild_id, find_player, guild_id, lord_id=player_id)
 
-        if player is None or player.empty:
+        if row is None:
             await ctx.respond("Player doesn't exist", ephemeral=True)
         else:
-            row = player.iloc[0]
-            reports = sorted(
-                {col.split(".")[1] for col in row.index if col.startswith("units_killed.")},
-                key=int
-            )
+            player_reports = await run_read(guild_id, load_player_reports, guild_id, int(row["lord_id"]))
+            reports = list(player_reports)
             msg = (
                 f"📊Stats for **{row['name']}**\n"
                 f"Faction - **{row['faction']}**\n\n"
@@ -258,29 +256,30 @@ class stats(
             stages = ["Start of season", "Mid season", "End of season"]
             for i, r in enumerate(reports, start=1):                
                 title = stages[i-1] if i <= len(stages) else f"Report {r}"
+                values = player_reports[r]
                 msg += f"🔹**{title}:**\n"
-                msg += f"⚡Power: {fmt(row.get(f'power.{r}', 0))}\n"
-                msg += f"🏅Merits: {fmt(row.get(f'merits.{r}', 0))}\n"
-                msg += f"⚔️Units killed: {fmt(row.get(f'units_killed.{r}', 0))}\n"
-                msg += f"💀Units dead: {fmt(row.get(f'units_dead.{r}', 0))}\n\n"
+                msg += f"⚡Power: {fmt(values.get('power', 0))}\n"
+                msg += f"🏅Merits: {fmt(values.get('merits', 0))}\n"
+                msg += f"⚔️Units killed: {fmt(values.get('units_killed', 0))}\n"
+                msg += f"💀Units dead: {fmt(values.get('units_dead', 0))}\n\n"
 
             if len(reports) >= 2:
-                start = reports[0]
-                end = reports[-1]
-                killed_start = int(row.get(f'units_killed.{start}', 0) or 0)
-                killed_end = int(row.get(f'units_killed.{end}', 0) or 0)
-                dead_start = int(row.get(f'units_dead.{start}', 0) or 0)
-                dead_end = int(row.get(f'units_dead.{end}', 0) or 0)
+                start = player_reports[reports[0]]
+                end = player_reports[reports[-1]]
+                killed_start = int(start.get('units_killed', 0) or 0)
+                killed_end = int(end.get('units_killed', 0) or 0)
+                dead_start = int(start.get('units_dead', 0) or 0)
+                dead_end = int(end.get('units_dead', 0) or 0)
 
                 msg += f"📈**Season result:**\n"
                 msg += f"⚔️Season units killed: {fmt(killed_end - killed_start)}\n"
                 for tier in range(1, 6):
-                    start_val = int(row.get(f"t{tier}_kill_count.{start}", 0) or 0)
-                    end_val = int(row.get(f"t{tier}_kill_count.{end}", 0) or 0)
+                    start_val = int(start.get(f"t{tier}_kill_count", 0) or 0)
+                    end_val = int(end.get(f"t{tier}_kill_count", 0) or 0)
                     diff = end_val - start_val
                     msg += f"T{tier} units killed: {fmt(diff)}\n"
                 msg += f"💀Season units dead: {fmt(dead_end - dead_start)}\n"
-                msg += f"🏅Season merits: {fmt(row.get(f'merits.{end}', 0))}\n"
+                msg += f"🏅Season merits: {fmt(end.get('merits', 0))}\n"
             
             message = await ctx.respond(msg, ephemeral=True)
             
@@ -290,77 +289,63 @@ class compare_kvk(
     name="compare_kvk",
     description="Compare current and previous kvk"
 ):
+    seasons = lightbulb.integer("seasons", "How many seasons to compare", default=2, min_value=2, max_value=6)
+    min_power = lightbulb.integer("min_power", "Only count players with at least this power", default=MIN_POWER, min_value=0)
 
     @lightbulb.invoke
+    @instrumented
     async def invoke(self, ctx: lightbulb.Context) -> None:
         guild_id = ctx.guild_id
         await ctx.defer(ephemeral=True)
-        if not table_exists(f"guild_{guild_id}"):
+        if not await run_blocking(table_exists, f"guild_{guild_id}"):
             await ctx.respond("No table loaded", ephemeral=True)
             return
-        if not table_exists(f"guild_{guild_id}_old"):
+        if not await run_blocking(table_exists, f"guild_{guild_id}_old"):
             await ctx.respond("Old table not loaded", ephemeral=True)
             return
-        _, df = load_players(guild_id)
-        old_df = load_previous_kvk(guild_id)
-
-        reports_new = sorted(
-            {col.split(".")[1] for col in df.columns if col.startswith("power.")},
-            key=int
-        )
-        reports_old = sorted(
-            {col.split(".")[1] for col in old_df.columns if col.startswith("power.")},
-            key=int
-        )
-        if len(reports_new) >= 2:
-            start_new = reports_new[0]
-            end_new = reports_new[-1]
-            df_filtered = df[df[f"power.{end_new}"] >=15000000].copy()
-            df_totals_power = df_filtered[f"power.{end_new}"].sum()
-            df_totals_merits = df_filtered[f"merits.{end_new}"].sum()
-            df_totals_units_killed = df_filtered[f"units_killed.{end_new}"].sum() - df_filtered[f"units_killed.{start_new}"].sum()
-            df_totals_units_dead = df_filtered[f"units_dead.{end_new}"].sum() - df_filtered[f"units_dead.{start_new}"].sum()
-        else:
+        results = await run_read(guild_id, compare_seasons, guild_id, self.seasons, self.min_power)
+        if results[-1][1] is None:
             await ctx.respond("The new kvk must have at least 2 reports", ephemeral=True)
             return
-
-        if len(reports_old) >= 2:
-            start_old = reports_old[0]
-            end_old = reports_old[-1]
-            old_df_filtered = old_df[old_df[f"power.{end_old}"] >=15000000].copy()
-            old_df_totals_power = old_df_filtered[f"power.{end_old}"].sum()
-            old_df_totals_merits = old_df_filtered[f"merits.{end_old}"].sum()
-            old_df_totals_units_killed = old_df_filtered[f"units_killed.{end_old}"].sum() - old_df_filtered[f"units_killed.{start_old}"].sum()
-            old_df_totals_units_dead = old_df_filtered[f"units_dead.{end_old}"].sum() - old_df_filtered[f"units_dead.{start_old}"].sum()
-        else:
+        if results[-2][1] is None:
             await ctx.respond("The old kvk must have at least 2 reports", ephemeral=True)
             return
-
-        old_values = [
-            f"⚡ Power: {fmt(int(old_df_totals_power))}",
-            f"🏅 Merits: {fmt(int(old_df_totals_merits))}",
-            f"⚔️ Units killed: {fmt(int(old_df_totals_units_killed))}",
-            f"💀 Units dead: {fmt(int(old_df_totals_units_dead))}",
-        ]
-
-        new_values = [
-            f"⚡ Power: {fmt(int(df_totals_power))}",
-            f"🏅 Merits: {fmt(int(df_totals_merits))}",
-            f"⚔️ Units killed: {fmt(int(df_totals_units_killed))}",
-            f"💀 Units dead: {fmt(int(df_totals_units_dead))}",
-        ]
-
-        max_len = max(visual_len(s) for s in old_values) + 1
-
+        results = [(suffix, totals) for suffix, totals in results if totals is not None]
+
+        headers = []
+        columns = []
+        for suffix, totals in results:
+            if not suffix:
+                headers.append("🔴 Current Season")
+            elif suffix == "_old":
+                headers.append("🟡 Previous Season")
+            else:
+                headers.append(f"⚪ Season -{suffix.rsplit('_', 1)[1]}")
+            columns.append([
+                f"⚡ Power: {fmt(totals['power'])}",
+                f"🏅 Merits: {fmt(totals['merits'])}",
+                f"⚔️ Units killed: {fmt(totals['units_killed'])}",
+                f"💀 Units dead: {fmt(totals['units_dead'])}",
+            ])
+
+        widths = [max(visual_len(s) for s in column) + 1 for column in columns[:-1]]
+
+        header = "".join(
+            f"{title}{' ' * (width - len(title))}| " for title, width in zip(headers, widths)
+        ) + headers[-1]
         lines = [
-            f"{old.ljust(max_len)}| {new}"
-            for old, new in zip(old_values, new_values)
+            "".join(f"{cell.ljust(width)}| " for cell, width in zip(row, widths)) + row[-1]
+            for row in zip(*columns)
         ]
 
+        if len(results) == 2:
+            title = "📊 **Compare current and previous kvk results**"
+        else:
+            title = f"📊 **Compare the last {len(results)} kvk results**"
         msg = (
-            f"📊 **Compare current and previous kvk results**\n\n"
+            f"{title}\n\n"
             "```\n"
-            f"🟡 Previous Season{' ' * (max_len - len('🟡 Previous Season'))}| 🔴 Current Season\n"
+            f"{header}\n"
             + "\n".join(lines) +
             "\n```"
         )
@@ -372,79 +357,89 @@ class compare_kvk(
 class rating(
     lightbulb.SlashCommand,
     name="rating",
-    description="Show top 20 players by Merits / Units Killed / Units Dead",
+    description="Show the rating by Merits / Units Killed / Units Dead",
 ):
     category = lightbulb.string(
         "category",
         "Choose what to rank by",
         autocomplete=category_autocomplete
     )
+    page = lightbulb.integer("page", "Page to open", default=1, min_value=1)
 
     @lightbulb.invoke
+    @instrumented
     async def invoke(self, ctx: lightbulb.Context) -> None:
         guild_id = ctx.guild_id
         await ctx.defer(ephemeral=True)
 
-        if not table_exists(f"guild_{guild_id}"):
+        if not await run_blocking(table_exists, f"guild_{guild_id}"):
             await ctx.respond("No table loaded", ephemeral=True)
             return
-        _, df = load_players(guild_id)
+        category = self.category
+        if category not in CATEGORIES:
+            await ctx.respond("⚠️ Unknown category", ephemeral=True)
+            return
+        boards = await run_snapshot_read(guild_id, leaderboard_cache, get_leaderboards, guild_id)
+        if not boards.reports:
+            await ctx.respond("❌ Add a report first!", ephemeral=True)
+            return
+        board = boards.get(category)
+        if board is None or not len(board):
+            await ctx.respond(f"⚠️ Немає даних для {category}", ephemeral=True)
+            return
 
-        keywords = ["Merits", "Units", "Power"]
+        page = board.clamp_page(self.page, RATING_PAGE_SIZE)
+        title = f"Top by season {category}" if boards.season else f"Top by {category}"
+        await show_rating(ctx, RatingMenu(board, title, page))
 
+@client.register()
+class rank(
+    lightbulb.SlashCommand,
+    name="rank",
+    description="Show where a player stands in the rating",
+):
+    category = lightbulb.string(
+        "category",
+        "Choose what to rank by",
+        autocomplete=category_autocomplete
+    )
+    name = lightbulb.string("nickname", "Player nickname", autocomplete=nickname_autocomplete, default="")
+    player_id = lightbulb.integer("id", "Player ID", default="")
+
+    @lightbulb.invoke
+    @instrumented
+    async def invoke(self, ctx: lightbulb.Context) -> None:
+        guild_id = ctx.guild_id
+        await ctx.defer(ephemeral=True)
+
+        if not await run_blocking(table_exists, f"guild_{guild_id}"):
+            await ctx.respond("No table loaded", ephemeral=True)
+            return
         category = self.category
-        reports = sorted(
-            {col.split(".")[1] for col in df.columns if col.startswith("power.")},
-            key=int
-        )
-        first = reports[0]
-        last = reports[-1]
-        if category == "Merits":
-            df_filtered = df[df["new_player"] != "migrant"].copy()
-            if df_filtered.empty:
-                await ctx.respond("⚠️ Немає даних для Units Killed", ephemeral=True)
-                return
-            data = df_filtered[["name", f"merits.{last}"]].sort_values(by=[f"merits.{last}"], ascending=False).head(20)
-            col = f"merits.{last}"
-        elif category == "Units Killed":
-            df_filtered = df[df["new_player"] != "migrant"].copy()
-            if df_filtered.empty:
-                await ctx.respond("⚠️ Немає даних для Units Killed", ephemeral=True)
-                return
-            if len(reports) == 1:
-                data = df_filtered[["name", f"units_killed.{last}"]].sort_values(by=[f"units_killed.{last}"], ascending=False).head(20)
-                col = f"units_killed.{last}"
-            else:
-                df_filtered["Diff"] = df_filtered[f"units_killed.{last}"] - df_filtered[f"units_killed.{first}"]
-                data = df_filtered[["name", "Diff"]].sort_values(by="Diff", ascending=False).head(20)
-                col = "Diff"
-        elif category == "Units Dead":
-            df_filtered = df[df["new_player"] != "migrant"].copy()
-            if df_filtered.empty:
-                await ctx.respond("⚠️ Немає даних для Units Dead", ephemeral=True)
-                return
-            if len(reports) == 1:
-                data = df_filtered[["name", f"units_dead.{last}"]].sort_values(by=[f"units_dead.{last}"], ascending=False).head(20)
-                col = f"units_dead.{last}"
-            else:
-                df_filtered["Diff"] = df_filtered[f"units_dead.{last}"] - df_filtered[f"units_dead.{first}"]
-                data = df_filtered[["name", "Diff"]].sort_values(by="Diff", ascending=False).head(20)
-                col = "Diff"
-        else:
+        if category not in CATEGORIES:
             await ctx.respond("⚠️ Unknown category", ephemeral=True)
             return
-        
-        lines = []
-        for i, row in enumerate(data.itertuples(index=False, name=None), start=1):
-            name, value = row
-            lines.append(f"{i}. **{name}** — {fmt(value)}")
 
-        if len(reports) == 1:
-            msg = f"🏆 **Top 20 by {category}** 🏆\n\n" + "\n".join(lines)
+        if self.name:
+            row = await run_read(guild_id, find_player, guild_id, name=self.name)
         else:
-            msg = f"🏆 **Top 20 by season {category}** 🏆\n\n" + "\n".join(lines)
+            row = await run_read(guild_id, find_player, guild_id, lord_id=self.player_id)
+        if row is None:
+            await ctx.respond("Player doesn't exist", ephemeral=True)
+            return
+
+        boards = await run_snapshot_read(guild_id, leaderboard_cache, get_leaderboards, guild_id)
+        board = boards.get(category)
+        position = board.position_of(int(row["lord_id"])) if board is not None else None
+        if position is None:
+            await ctx.respond(f"⚠️ **{row['name']}** is not ranked by {category}", ephemeral=True)
+            return
 
-        await ctx.respond(msg, ephemeral=True)
+        place = board.rank_of(int(row["lord_id"]))
+        title = (
+            f"{row['name']} is #{place} of {len(board)} by {'season ' if boards.season else ''}{category}"
+        )
+        await show_rating(ctx, RatingMenu(board, title, position // RATING_PAGE_SIZE, position))
 
 @client.register()
 class remove_player(
@@ -458,16 +453,18 @@ class remove_player(
     player_id = lightbulb.integer("id", "Player ID", default=0)
 
     @lightbulb.invoke
+    @instrumented
     async def invoke(self, ctx: lightbulb.Context) -> None:
         guild_id = ctx.guild_id
         await ctx.defer(ephemeral=True)
-        if not table_exists(f"guild_{guild_id}"):
+        if not await run_blocking(table_exists, f"guild_{guild_id}"):
             await ctx.respond("No table loaded", ephemeral=True)
             return
         nickname = self.name
         player_id = self.player_id
 
-        await ctx.respond(delete_player(guild_id, player_id, nickname), ephemeral=True)
+        result = await run_write(guild_id, delete_player, guild_id, player_id, nickname)
+        await ctx.respond(result, ephemeral=True)
 
 @client.register()
 class merits_rating(
@@ -477,55 +474,84 @@ class merits_rating(
 ):
     min_percent = lightbulb.number("min_percent", "min %", default=0.0)
     max_percent = lightbulb.number("max_percent", "max %", default=100.0)
+    file_format = lightbulb.string(
+        "format",
+        "File format",
+        choices=[lightbulb.Choice(fmt_name, fmt_name) for fmt_name in EXPORT_FORMATS],
+        default="xlsx"
+    )
 
     @lightbulb.invoke
+    @instrumented
     async def invoke(self, ctx: lightbulb.Context) -> None:
         guild_id = ctx.guild_id
         table_name = f"guild_{guild_id}"
         await ctx.defer(ephemeral=True)
 
-        if not table_exists(table_name):
+        if not await run_blocking(table_exists, table_name):
             await ctx.respond("No table loaded", ephemeral=True)
             return
-        _, df = load_players(guild_id)
         min_percent = self.min_percent
         max_percent = self.max_percent
-        reports = sorted(
-            {col.split(".")[1] for col in df.columns if col.startswith("power.")},
-            key=int
-        )
-        first = reports[0]
-        last = reports[-1]
 
-        if "merits_%" not in df.columns:
+        export = await run_snapshot_read(guild_id, export_cache, build_merits_list, guild_id, min_percent, max_percent, self.file_format)
+        if export == NO_REPORTS:
             await ctx.respond("❌ Add a report first!", ephemeral=True)
             return
-
-        filtered = df[
-            (df["merits_%"] >= min_percent) &
-            (df["merits_%"] <= max_percent) &
-            (df[f"power.{last}"] > 15_000_000)
-        ].copy()
-
-        if filtered.empty:
+        if export is None:
             await ctx.respond("ℹ️ There are no eligible players.", ephemeral=True)
             return
 
-        filtered = filtered.sort_values("merits_%", ascending=False)
-
-        file_path = f"merits_list_{ctx.guild_id}_{int(time.time())}.xlsx"
-        filtered.to_excel(
-            file_path,
-            columns=["name", "merits_%", f"merits.{last}", f"power.{last}"],
-            index=False,
-            engine="openpyxl"
-        )
-
+        filename, data = export
         await ctx.respond(
             f"📄 Merits list from {min_percent}% to {max_percent}% (Power > 15M):",
-            attachment=hikari.File(file_path),
+            attachment=hikari.Bytes(data, filename),
             flags=hikari.MessageFlag.EPHEMERAL
         )
-        os.remove(file_path)
 
-bot.run()
\ No newline at end of file
+@client.register()
+class export(
+    lightbulb.SlashCommand,
+    name="export",
+    description="Download the whole table",
+    default_member_permissions=hikari.Permissions.ADMINISTRATOR
+):
+    file_format = lightbulb.string(
+        "format",
+        "File format",
+        choices=[lightbulb.Choice(fmt_name, fmt_name) for fmt_name in DUMP_FORMATS],
+        default="csv"
+    )
+    include_old = lightbulb.boolean("include_old", "Also export the previous season", default=False)
+
+    @lightbulb.invoke
+    @instrumented
+    async def invoke(self, ctx: lightbulb.Context) -> None:
+        guild_id = ctx.guild_id
+        await ctx.defer(ephemeral=True)
+
+        if not await run_blocking(table_exists, f"guild_{guild_id}"):
+            await ctx.respond("No table loaded", ephemeral=True)
+            return
+
+        # parts are written to disk and uploaded from there, the table is never held in memory
+        with tempfile.TemporaryDirectory() as directory:
+            try:
+                paths = await run_read(guild_id, dump_tables, guild_id, self.file_format, directory, self.include_old)
+            except ValueError as e:
+                await ctx.respond(f"❌ {e}", ephemeral=True)
+                return
+            if not paths:
+                await ctx.respond("ℹ️ There is nothing to export.", ephemeral=True)
+                return
+
+            sent = 0
+            for batch in batch_parts(paths):
+                await ctx.respond(
+                    f"📦 Export ({sent + 1}-{sent + len(batch)} of {len(paths)} files):",
+                    attachments=[hikari.File(path) for path in batch],
+                    flags=hikari.MessageFlag.EPHEMERAL
+                )
+                sent += len(batch)
+
+bot.run(shard_ids=SHARD_IDS, shard_count=SHARD_COUNT)
@@ -0,0 +1,114 @@
+import json
+import select
+import threading
+from sqlalchemy import text
+
+CHANNEL = "guild_changes"
+RECONNECT_DELAY = 5.0
+POLL_TIMEOUT = 5.0
+
+class LocalBus:
+    def __init__(self) -> None:
+        self._handlers: list[tuple[str, object]] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, origin: str, handler, on_reset=None) -> None:
+        with self._lock:
+            self._handlers.append((origin, handler))
+
+    def publish(self, origin: str, guild_id: int) -> None:
+        with self._lock:
+            handlers = list(self._handlers)
+        for subscriber, handler in handlers:
+            if subscriber != origin:
+                handler(guild_id)
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+class PostgresBus:
+    # notifications go through the shared database, the listener runs on its own
+    # connection so it never holds a slot in the engine's pool
+    def __init__(self, engine, channel: str = CHANNEL) -> None:
+        self.engine = engine
+        self.channel = channel
+        self._handlers: list[tuple[str, object, object]] = []
+        self._thread: threading.Thread | None = None
+        self._stopping = threading.Event()
+
+    def subscribe(self, origin: str, handler, on_reset=None) -> None:
+        self._handlers.append((origin, handler, on_reset))
+
+    def publish(self, origin: str, guild_id: int) -> None:
+        payload = json.dumps({"origin": origin, "guild_id": guild_id})
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": self.channel, "payload": payload})
+        except Exception as e:
+            print(f"Cache invalidation for guild {guild_id} was not published: {e}")
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._listen, name="cache-bus", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=POLL_TIMEOUT + 1)
+            self._thread = None
+
+    def _connect(self):
+        dsn = self.engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        conn = self.engine.dialect.dbapi.connect(dsn)
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {self.channel}")
+        return conn
+
+    def _listen(self) -> None:
+        connected_once = False
+        while not self._stopping.is_set():
+            try:
+                conn = self._connect()
+            except Exception as e:
+                print(f"Cache bus connection failed: {e}")
+                self._stopping.wait(RECONNECT_DELAY)
+                continue
+            # anything published while we were away is lost, so drop everything
+            if connected_once:
+                for _, _, on_reset in self._handlers:
+                    if on_reset:
+                        on_reset()
+            connected_once = True
+            try:
+                while not self._stopping.is_set():
+                    if select.select([conn], [], [], POLL_TIMEOUT) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self._dispatch(conn.notifies.pop(0).payload)
+            except Exception as e:
+                print(f"Cache bus connection lost: {e}")
+                self._stopping.wait(1)
+            finally:
+                conn.close()
+
+    def _dispatch(self, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            return
+        for origin, handler, _ in self._handlers:
+            if message.get("origin") != origin:
+                handler(int(message["guild_id"]))
+
+def make_bus(kind: str, engine):
+    if kind == "postgres":
+        return PostgresBus(engine)
+    return LocalBus()
@@ -0,0 +1,86 @@
+import sys
+import threading
+from collections import OrderedDict
+
+
+def strings_size(values) -> int:
+    # numpy and pandas only count the pointers of object columns
+    return sum(sys.getsizeof(value) for value in values)
+
+class CacheBudget:
+    # every per-guild cache draws on this one budget, so the configured
+    # ceiling holds for the whole process instead of once per cache
+    def __init__(self, max_bytes: int, max_entries: int) -> None:
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.total_bytes = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._counts: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple, version: int):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: tuple, version: int, value, size: int) -> None:
+        # a single guild bigger than the whole budget is never cached
+        if size > self.max_bytes:
+            return
+        name = key[0]
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (version, value, size)
+            self.total_bytes += size
+            self._counts[name] = self._counts.get(name, 0) + 1
+            while self.total_bytes > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+            if self._counts[name] > self.max_entries:
+                self._pop(next(other for other in self._entries if other[0] == name))
+
+    def sizes(self, name: str | None = None) -> dict[tuple, int]:
+        with self._lock:
+            return {key: entry[2] for key, entry in self._entries.items() if name is None or key[0] == name}
+
+    def invalidate(self, key: tuple) -> None:
+        with self._lock:
+            self._pop(key)
+
+    def forget_guild(self, guild_id: int) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key[1] == guild_id]:
+                self._pop(key)
+
+    def clear(self, name: str | None = None) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if name is None or key[0] == name]:
+                self._pop(key)
+
+    def _pop(self, key: tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[2]
+            self._counts[key[0]] -= 1
+
+class SnapshotCache:
+    def __init__(self, name: str, budget: CacheBudget) -> None:
+        self.name = name
+        self.budget = budget
+
+    def get(self, guild_id: int, version: int):
+        return self.budget.get((self.name, guild_id), version)
+
+    def put(self, guild_id: int, version: int, value, size: int) -> None:
+        self.budget.put((self.name, guild_id), version, value, size)
+
+    def sizes(self) -> dict[int, int]:
+        return {guild_id: size for (_, guild_id), size in self.budget.sizes(self.name).items()}
+
+    def invalidate(self, guild_id: int) -> None:
+        self.budget.invalidate((self.name, guild_id))
+
+    def clear(self) -> None:
+        self.budget.clear(self.name)
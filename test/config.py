@@ -5,4 +5,31 @@ load_dotenv()
 
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
 DATABASE_URL = os.getenv("DATABASE_URL")
-# GUILD_ID = int(os.getenv("GUILD_ID"))
\ No newline at end of file
+# GUILD_ID = int(os.getenv("GUILD_ID"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", 512 * 1024 * 1024))
+CACHE_MAX_GUILDS = int(os.getenv("CACHE_MAX_GUILDS", 256))
+DB_READ_WORKERS = int(os.getenv("DB_READ_WORKERS", 4))
+DB_WRITE_WORKERS = int(os.getenv("DB_WRITE_WORKERS", 2))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 25 * 1024 * 1024))
+HEALTH_HOST = os.getenv("HEALTH_HOST", "0.0.0.0")
+HEALTH_PORT = int(os.getenv("HEALTH_PORT", 8080))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 5))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# "local" keeps invalidation in-process, "postgres" shares it across shard processes
+CACHE_BUS = os.getenv("CACHE_BUS", "local")
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", 0)) or None
+SHARD_IDS = [int(shard) for shard in os.getenv("SHARD_IDS", "").split(",") if shard.strip()] or None
+if SHARD_IDS and not SHARD_COUNT:
+    raise ValueError("SHARD_IDS is set, so SHARD_COUNT must give the total number of shards")
+if SHARD_IDS and max(SHARD_IDS) >= SHARD_COUNT:
+    raise ValueError(f"SHARD_IDS must be below SHARD_COUNT ({SHARD_COUNT})")
+# Discord's attachment limit for servers without boosts is 10 MB
+EXPORT_PART_BYTES = int(os.getenv("EXPORT_PART_BYTES", 8 * 1024 * 1024))
+# the same limit applies to all attachments of one message together
+EXPORT_MESSAGE_BYTES = int(os.getenv("EXPORT_MESSAGE_BYTES", 10 * 1024 * 1024))
+# how many past seasons are kept as guild_{id}_old, guild_{id}_old_2, ...
+ARCHIVE_SEASONS = int(os.getenv("ARCHIVE_SEASONS", 3))
+GUILD_READ_LIMIT = int(os.getenv("GUILD_READ_LIMIT", 2))
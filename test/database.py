@@ -1,43 +1,288 @@
+import re
+import threading
+import uuid
+from contextlib import contextmanager
 import pandas as pd
 import numpy as np
-from sqlalchemy import create_engine, inspect, text
+from sqlalchemy import create_engine, inspect, make_url, text
 from sqlalchemy.exc import SQLAlchemyError
-from config import DATABASE_URL
-
-engine = create_engine(DATABASE_URL)
+from config import DATABASE_URL, CACHE_MAX_BYTES, CACHE_MAX_GUILDS
+from config import DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING, CACHE_BUS
+from config import ARCHIVE_SEASONS
+from bus import make_bus
+from cache import CacheBudget, SnapshotCache
+from schema import conform_frame, compact_frame, frame_footprint
+from metrics import REGISTRY, Gauge, instrument_engine
+
+# SQLite may get a single-connection pool that rejects the sizing arguments
+_pool_options = {}
+if make_url(DATABASE_URL).get_backend_name() != "sqlite":
+    _pool_options = {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW, "pool_timeout": DB_POOL_TIMEOUT}
+engine = create_engine(DATABASE_URL, pool_recycle=DB_POOL_RECYCLE, pool_pre_ping=DB_POOL_PRE_PING, **_pool_options)
+instrument_engine(engine)
+
+cache_budget = CacheBudget(CACHE_MAX_BYTES, CACHE_MAX_GUILDS)
+snapshot_cache = SnapshotCache("players", cache_budget)
+REGISTRY.append(Gauge(
+    "bot_guild_cache_bytes", "Memory held by each cached guild snapshot",
+    lambda: [({"cache": name, "guild": guild_id}, size) for (name, guild_id), size in cache_budget.sizes().items()]
+))
+_data_versions: dict[int, int] = {}
+# identifies this process on the bus so it ignores its own notifications
+ORIGIN = uuid.uuid4().hex
+
+def data_version(guild_id: int) -> int:
+    return _data_versions.setdefault(guild_id, 0)
+
+def _invalidate_local(guild_id: int) -> int:
+    version = data_version(guild_id) + 1
+    _data_versions[guild_id] = version
+    cache_budget.forget_guild(guild_id)
+    return version
+
+def bump_version(guild_id: int) -> int:
+    version = _invalidate_local(guild_id)
+    bus.publish(ORIGIN, guild_id)
+    return version
+
+class SchemaRegistry:
+    def __init__(self, engine) -> None:
+        self.engine = engine
+        self._tables: dict[str, bool] = {}
+        self._columns: dict[str, list[str]] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        with self._lock:
+            generation = self._generation
+        names = inspect(self.engine).get_table_names()
+        with self._lock:
+            if generation == self._generation:
+                self._tables = dict.fromkeys(names, True)
+
+    def has_table(self, table_name: str) -> bool:
+        with self._lock:
+            cached = self._tables.get(table_name)
+            generation = self._generation
+        if cached is not None:
+            return cached
+        exists = inspect(self.engine).has_table(table_name)
+        # a DDL that finished while we were asking makes the answer stale
+        with self._lock:
+            if generation == self._generation:
+                self._tables[table_name] = exists
+        return exists
+
+    def columns(self, table_name: str) -> list[str]:
+        with self._lock:
+            cached = self._columns.get(table_name)
+            generation = self._generation
+        if cached is not None:
+            return cached
+        columns = [col["name"] for col in inspect(self.engine).get_columns(table_name)]
+        with self._lock:
+            if generation == self._generation:
+                self._columns[table_name] = columns
+        return columns
+
+    def invalidate(self, *table_names: str) -> None:
+        with self._lock:
+            self._generation += 1
+            for table_name in table_names:
+                self._tables.pop(table_name, None)
+                self._columns.pop(table_name, None)
+
+    def forget_guild(self, guild_id: int) -> None:
+        pattern = re.compile(rf"^[a-z]+_{guild_id}(_|$)")
+        with self._lock:
+            names = [name for name in {*self._tables, *self._columns} if pattern.match(name)]
+        self.invalidate(*names)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._tables.clear()
+            self._columns.clear()
+
+schema_registry = SchemaRegistry(engine)
+
+@contextmanager
+def ddl_transaction(*table_names: str):
+    # invalidated after the commit as well, so no reader can cache the pre-DDL state
+    try:
+        with engine.begin() as conn:
+            yield conn
+    finally:
+        schema_registry.invalidate(*table_names)
+
+def _on_remote_change(guild_id: int) -> None:
+    schema_registry.forget_guild(guild_id)
+    _invalidate_local(guild_id)
+
+def _on_bus_reset() -> None:
+    schema_registry.clear()
+    for guild_id in list(_data_versions):
+        _invalidate_local(guild_id)
+
+bus = make_bus(CACHE_BUS, engine)
+bus.subscribe(ORIGIN, _on_remote_change, _on_bus_reset)
+
+@contextmanager
+def guild_write_lock(guild_id: int):
+    # the asyncio locks in executor only cover one process, shards share this one
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+    with engine.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": guild_id})
+        conn.commit()
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": guild_id})
+            conn.commit()
 
 def table_exists(table_name: str) -> bool:
-    inspector = inspect(engine)
-    return inspector.has_table(table_name)
-def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
-    df.columns = (
-        df.columns.str.strip()  # прибрати пробіли з початку та кінця
-                  .str.lower()  # усе в нижній регістр
-                  .str.replace(" ", "_")  # пробіли → "_"
-                  .str.replace(r"\.", "_", regex=True)  # крапки → "_"
-    )
-    return df
-def clean_dataframe(df: pd.DataFrame, int_keywords=None, str_keywords=None) -> pd.DataFrame:
-    if int_keywords is None:
-        int_keywords = ["power", "merits", "units", "id", "server", "city", "defeats", "victories", "scouted", "gold", "wood", "ore", "mana", "gems", "resources", "helps", "killcount"]
-    if str_keywords is None:
-        str_keywords = ["Name", "%"]
+    return schema_registry.has_table(table_name)
 
-    for col in df.columns:
-        if df[col].dtype == "float64":
-            df[col] = df[col].fillna(0).astype("int64")
-        if any(keyword.lower() in col.lower() for keyword in int_keywords):
-            df[col] = (
-                df[col]
-                .fillna(0)
-                .astype(str)
-                .str.replace(r"[^\d]", "", regex=True)
-                .replace("", "0")
-                .astype("int64")
-            )
-        elif any(keyword.lower() in col.lower() for keyword in str_keywords) or df[col].dtype == object:
-            df[col] = df[col].fillna("").astype(str)
-    return df
+def warm_up(connections: int = DB_POOL_SIZE) -> None:
+    opened = []
+    try:
+        for _ in range(connections):
+            conn = engine.connect()
+            opened.append(conn)
+            conn.execute(text("SELECT 1"))
+        schema_registry.load()
+    except SQLAlchemyError as e:
+        print(f"Database warm-up failed: {e}")
+    finally:
+        for conn in opened:
+            conn.close()
+
+def migrate_name_keys() -> None:
+    # tables written before name_key existed are backfilled once, at startup
+    pattern = re.compile(r"^(guild|names)_(\d+)(_old(_\d+)?)?$")
+    for table_name in inspect(engine).get_table_names():
+        match = pattern.match(table_name)
+        if not match or NAME_KEY in schema_registry.columns(table_name):
+            continue
+        try:
+            with guild_write_lock(int(match.group(2))), ddl_transaction(table_name) as conn:
+                if match.group(1) == "guild":
+                    _ensure_guild_indexes(conn, table_name)
+                elif NAME_KEY not in {col["name"] for col in inspect(conn).get_columns(table_name)}:
+                    _backfill_name_keys(conn, table_name)
+        except SQLAlchemyError as e:
+            print(f"Adding {NAME_KEY} to {table_name} failed: {e}")
+
+def ping() -> bool:
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return True
+    except SQLAlchemyError as e:
+        print(f"Database ping failed: {e}")
+        return False
+
+NAME_KEY = "name_key"
+SEASON_METRICS = ["power", "merits", "units_killed", "units_dead"]
+
+def report_columns(df: pd.DataFrame) -> list[str]:
+    return [
+        col for col in df.columns
+        if "." in col and col.rsplit(".", 1)[1].isdigit() and pd.api.types.is_numeric_dtype(df[col])
+    ]
+
+def _create_reports_table(conn, table_name: str):
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {table_name} (
+            lord_id BIGINT NOT NULL,
+            report_no INTEGER NOT NULL,
+            metric TEXT NOT NULL,
+            value BIGINT,
+            PRIMARY KEY (lord_id, report_no, metric)
+        )
+    """))
+    conn.execute(text(
+        f"CREATE INDEX IF NOT EXISTS ix_{table_name}_metric ON {table_name} (metric, report_no, value)"
+    ))
+
+def _write_reports(conn, table_name: str, df: pd.DataFrame, columns: list[str]):
+    if not columns or df.empty:
+        return
+    long_df = df[["lord_id", *columns]].melt(id_vars="lord_id", var_name="column").dropna(subset=["value"])
+    parts = long_df["column"].str.rsplit(".", n=1, expand=True)
+    long_df = pd.DataFrame({
+        "lord_id": long_df["lord_id"].astype("int64"),
+        "report_no": parts[1].astype("int64"),
+        "metric": parts[0],
+        "value": long_df["value"].astype("int64"),
+    })
+    slots = [{"metric": col.rsplit(".", 1)[0], "report_no": int(col.rsplit(".", 1)[1])} for col in columns]
+    conn.execute(text(f"DELETE FROM {table_name} WHERE metric = :metric AND report_no = :report_no"), slots)
+    long_df.to_sql(table_name, conn, if_exists="append", index=False, chunksize=10_000)
+
+def ensure_reports_table(guild_id: int, suffix: str = "") -> str:
+    table_name = f"reports_{guild_id}{suffix}"
+    wide_table = f"guild_{guild_id}{suffix}"
+    if table_exists(table_name):
+        return table_name
+
+    # guilds uploaded before the long format existed are backfilled once
+    wide = pd.read_sql(f"SELECT * FROM {wide_table}", engine) if table_exists(wide_table) else None
+    with ddl_transaction(table_name) as conn:
+        _create_reports_table(conn, table_name)
+        if wide is not None:
+            _write_reports(conn, table_name, wide, report_columns(wide))
+    return table_name
+
+def season_suffix(season: int) -> str:
+    return "_old" if season == 1 else f"_old_{season}"
+
+def _rename_archive(conn, guild_id: int, source: str, target: str):
+    # explicit index names follow the table, otherwise the next season's IF NOT EXISTS would skip them
+    guild_source, guild_target = f"guild_{guild_id}{source}", f"guild_{guild_id}{target}"
+    reports_source, reports_target = f"reports_{guild_id}{source}", f"reports_{guild_id}{target}"
+    indexes = ("lord_id", "name_key", "name_lower")
+    for index in (*(f"ix_{guild_source}_{column}" for column in indexes), f"ix_{reports_source}_metric"):
+        conn.execute(text(f"DROP INDEX IF EXISTS {index}"))
+    if table_exists(guild_source):
+        conn.execute(text(f"ALTER TABLE {guild_source} RENAME TO {guild_target}"))
+        _ensure_guild_indexes(conn, guild_target)
+    if table_exists(reports_source):
+        conn.execute(text(f"ALTER TABLE {reports_source} RENAME TO {reports_target}"))
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{reports_target}_metric ON {reports_target} (metric, report_no, value)"
+        ))
+
+def archive_season(guild_id: int, keep: int = ARCHIVE_SEASONS) -> bool:
+    table_name = f"guild_{guild_id}"
+    if keep < 1 or not table_exists(table_name):
+        return False
+    reports_table = ensure_reports_table(guild_id)
+    seasons = len(archived_seasons(guild_id))
+    touched = [
+        f"{prefix}_{guild_id}{season_suffix(season)}"
+        for prefix in ("guild", "reports") for season in range(1, max(seasons, keep) + 2)
+    ]
+
+    # everything stays in the database: the oldest season is dropped, the rest
+    # shift back one place and the current tables are copied in as _old
+    with ddl_transaction(*touched) as conn:
+        for season in range(keep, max(seasons, keep) + 1):
+            conn.execute(text(f"DROP TABLE IF EXISTS guild_{guild_id}{season_suffix(season)}"))
+            conn.execute(text(f"DROP TABLE IF EXISTS reports_{guild_id}{season_suffix(season)}"))
+        for season in range(min(seasons, keep - 1), 0, -1):
+            _rename_archive(conn, guild_id, season_suffix(season), season_suffix(season + 1))
+
+        old_table_name = f"{table_name}_old"
+        old_reports = f"{reports_table}_old"
+        conn.execute(text(f"CREATE TABLE {old_table_name} AS SELECT * FROM {table_name}"))
+        _ensure_guild_indexes(conn, old_table_name)
+        _create_reports_table(conn, old_reports)
+        conn.execute(text(f"INSERT INTO {old_reports} SELECT * FROM {reports_table}"))
+    return True
 
 def mark_new_players(df: pd.DataFrame, old_table: pd.DataFrame | None, current_table: pd.DataFrame | None) -> pd.DataFrame:
     if "new_player" not in df.columns:
@@ -72,86 +317,170 @@ def add_merits_percent(df: pd.DataFrame) -> pd.DataFrame:
         key=int
     )
     last = reports[-1]
-    df["merits_%"] = df.apply(lambda row: round((row[f"merits.{last}"] / row[f"power.{last}"] * 100), 2) if row[f"power.{last}"] > 0 else 0, axis=1)
+    power = df[f"power.{last}"]
+    merits = df[f"merits.{last}"]
+    df["merits_%"] = np.where(power > 0, (merits / power.where(power > 0, 1) * 100).round(2), 0)
 
     return df
 
+def _sql_type(series: pd.Series) -> str:
+    if series.dtype.kind in "iub":
+        return "BIGINT"
+    if series.dtype.kind == "f":
+        return "DOUBLE PRECISION"
+    return "TEXT"
+
+def name_key(name) -> str | None:
+    # folded in Python for writes and lookups alike, database lower() only
+    # folds ASCII on SQLite and under a C ctype on PostgreSQL
+    return None if pd.isna(name) else str(name).casefold()
+
+def _backfill_name_keys(conn, table_name: str):
+    # tables written before name_key existed get it once, on their next write
+    conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {NAME_KEY} TEXT"))
+    names = pd.read_sql(text(f"SELECT lord_id, name FROM {table_name}"), conn)
+    keys = [{"lord_id": int(lord_id), "key": name_key(name)} for lord_id, name in names.itertuples(index=False)]
+    if keys:
+        conn.execute(text(f"UPDATE {table_name} SET {NAME_KEY} = :key WHERE lord_id = :lord_id"), keys)
+
+def _ensure_guild_indexes(conn, table_name: str, lookup: bool = True):
+    conn.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS ix_{table_name}_lord_id ON {table_name} (lord_id)"))
+    if lookup:
+        if NAME_KEY not in {col["name"] for col in inspect(conn).get_columns(table_name)}:
+            _backfill_name_keys(conn, table_name)
+        conn.execute(text(f"DROP INDEX IF EXISTS ix_{table_name}_name_lower"))
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table_name}_name_key ON {table_name} ({NAME_KEY})"))
+
+def _upsert_table(conn, df: pd.DataFrame, table_name: str, prune: bool = True):
+    stage_table = f"{table_name}_stage"
+    if not table_exists(table_name):
+        df.head(0).to_sql(table_name, conn, index=False)
+        existing = set(df.columns)
+    else:
+        existing = set(schema_registry.columns(table_name))
+    _ensure_guild_indexes(conn, table_name)
+    existing.add(NAME_KEY)
+
+    for col in df.columns:
+        if col not in existing:
+            conn.execute(text(f'ALTER TABLE {table_name} ADD COLUMN "{col}" {_sql_type(df[col])}'))
+
+    conn.execute(text(f"DROP TABLE IF EXISTS {stage_table}"))
+    df.to_sql(stage_table, conn, index=False, chunksize=10_000)
+    _ensure_guild_indexes(conn, stage_table, lookup=False)
+
+    columns = ", ".join(f'"{col}"' for col in df.columns)
+    value_cols = [col for col in df.columns if col != "lord_id"]
+    assignments = ", ".join(f'"{col}" = EXCLUDED."{col}"' for col in value_cols)
+    changed = " OR ".join(f'{table_name}."{col}" IS DISTINCT FROM EXCLUDED."{col}"' for col in value_cols)
+    conn.execute(text(f"""
+        INSERT INTO {table_name} ({columns})
+        SELECT {columns} FROM {stage_table} WHERE true
+        ON CONFLICT (lord_id) DO UPDATE SET {assignments}
+        WHERE {changed}
+    """))
+    if prune:
+        conn.execute(text(f"""
+            DELETE FROM {table_name}
+            WHERE NOT EXISTS (SELECT 1 FROM {stage_table} s WHERE s.lord_id = {table_name}.lord_id)
+        """))
+    conn.execute(text(f"DROP TABLE {stage_table}"))
+
+def _swap_table(conn, df: pd.DataFrame, table_name: str):
+    # the new table is built aside and renamed in, so readers never see it missing
+    new_table = f"{table_name}_new"
+    swap_table = f"{table_name}_swap"
+    conn.execute(text(f"DROP TABLE IF EXISTS {new_table}"))
+    df.to_sql(new_table, conn, index=False, chunksize=10_000)
+    if table_exists(table_name):
+        conn.execute(text(f"ALTER TABLE {table_name} RENAME TO {swap_table}"))
+    conn.execute(text(f"ALTER TABLE {new_table} RENAME TO {table_name}"))
+    conn.execute(text(f"DROP TABLE IF EXISTS {swap_table}"))
+    _ensure_guild_indexes(conn, table_name)
+
 def clear_guild_data(guild_id: int) -> bool:
+    seasons = [season_suffix(season) for season in range(1, max(len(archived_seasons(guild_id)), ARCHIVE_SEASONS) + 1)]
     tables_to_drop = [
         f"guild_{guild_id}",
-        f"guild_{guild_id}_old",
-        f"names_{guild_id}"
+        f"names_{guild_id}",
+        f"reports_{guild_id}",
+        *(f"{prefix}_{guild_id}{suffix}" for prefix in ("guild", "reports") for suffix in seasons),
     ]
 
     try:
-        with engine.begin() as conn:
+        with ddl_transaction(*tables_to_drop) as conn:
             for table in tables_to_drop:
                 conn.execute(text(f"DROP TABLE IF EXISTS {table} CASCADE;"))
+        bump_version(guild_id)
         return True
 
     except SQLAlchemyError as e:
         print(f"⚠️ DB Error while clearing guild {guild_id}: {e}")
         return False
 
-def save_table(df: pd.DataFrame, guild_id: int, archive: bool):
-    df = normalize_columns(df)
-    df = clean_dataframe(df)
-    table_name = f"guild_{guild_id}"
-    old_table_name = f"guild_{guild_id}_old"
+def save_table(df: pd.DataFrame, guild_id: int, archive: bool, progress=None):
+    df = conform_frame(df)
 
     if df is None or df.empty:
         return False
 
     if archive:
-        try:
-            old_df = pd.read_sql(f"SELECT * FROM {table_name}", engine)
-            old_df.to_sql(old_table_name, engine, if_exists="replace", index=False)
-        except Exception:
-            old_df = None
-
-        try:
-            old_table = pd.read_sql(f"SELECT * FROM {old_table_name}", engine)
-        except Exception:
-            old_table = None
-
-        df = mark_new_players(df, old_table, old_df)
-    try:
-        with engine.begin() as conn:
-            conn.execute(text(f"DROP TABLE IF EXISTS {table_name}"))
-    except Exception as e:
-        print(f"⚠️ Error clearing table {table_name}: {e}")
-
-    return save_file_to_db(df, guild_id)
-def save_file_to_db(df: pd.DataFrame, guild_id: int):
-    df = normalize_columns(df)
-    df = clean_dataframe(df)
+        if progress:
+            progress("archive")
+        archive_season(guild_id)
+
+    return save_file_to_db(df, guild_id, replace=True, progress=progress)
+def merge_report(old_df: pd.DataFrame, new_df: pd.DataFrame) -> pd.DataFrame:
+    # repeated ids collapse to their last non-NaN values, so NaN never overwrites
+    new = new_df.dropna(subset=["lord_id"]).groupby("lord_id", sort=False).last()
+    old = old_df.set_index("lord_id")
+
+    added_ids = new.index[~new.index.isin(old.index)]
+    order = old.index.append(added_ids) if not old.empty else added_ids
+    columns = [*old.columns, *[col for col in new.columns if col not in old.columns]]
+    merged = new.combine_first(old) if not old.empty else new
+    merged = merged.reindex(index=order, columns=columns)
+
+    added = ~merged.index.isin(old.index)
+    back_cols = [col for col in old.columns if col not in new.columns]
+    if old.empty:
+        merged[back_cols] = 0
+    elif added.any() and back_cols:
+        gaps = merged.loc[added, back_cols]
+        merged.loc[added, back_cols] = gaps.mask(gaps.isna(), 0)
+        for col in back_cols:
+            merged[col] = merged[col].infer_objects()
+
+    # alignment upcasts integer columns to float, restore them once the gaps are filled
+    for col in columns:
+        source = new[col] if col in new.columns else old[col]
+        if source.dtype.kind in "iu" and merged[col].dtype.kind == "f" and not merged[col].isna().any():
+            merged[col] = merged[col].astype(source.dtype)
+    return merged.rename_axis("lord_id").reset_index()
+
+def save_file_to_db(df: pd.DataFrame, guild_id: int, replace: bool = False, progress=None, season: int = 1):
+    df = conform_frame(df)
     table_name = f"guild_{guild_id}"
-    old_table_name = f"guild_{guild_id}_old"
     key_cols = ["lord_id", "name", "alliance_id", "alliance_tag", "faction", "division", "new_player"]
+    reports_table = ensure_reports_table(guild_id)
 
+    if progress:
+        progress("merge")
     df["lord_id"] = df["lord_id"].fillna(0).astype("int64")
     df = df[df["lord_id"] > 0]
-    try:
-        old_df = pd.read_sql(f"SELECT * FROM {table_name}", engine)
-    except Exception:
-        old_df = pd.DataFrame(columns=key_cols)
+    old_df = pd.DataFrame(columns=key_cols)
+    if not replace:
+        try:
+            old_df = pd.read_sql(f"SELECT * FROM {table_name}", engine)
+        except Exception:
+            pass
     if not old_df.empty and "lord_id" in old_df.columns:
         old_df = old_df[old_df["lord_id"].isin(df["lord_id"])].copy()
 
-    if not old_df.empty:
-        report_cols = [col for col in old_df.columns if col.startswith("power.")]
-        report_count = len(report_cols)
-        if report_count >= 3:
-            return False
-
-    try:
-        old_table = pd.read_sql(f"SELECT * FROM {old_table_name}", engine)
-    except Exception:
-        old_table = None
-
-    df = mark_new_players(df, old_table, old_df)
+    df = mark_new_players(df, load_season_ids(guild_id, season), old_df)
 
     new_df = df.copy()
+    new_cols = []
     for col in df.columns:
         if col in key_cols:
             continue
@@ -162,116 +491,186 @@ def save_file_to_db(df: pd.DataFrame, guild_id: int):
             index += 1
             new_col = f"{base_col}.{index}"
         new_df = new_df.rename(columns={col: new_col})
-    old_map = old_df.set_index("lord_id").to_dict(orient="index")
-    for _, row in new_df.iterrows():
-        lord_id = row["lord_id"]
-        if pd.isna(lord_id):
-            continue
-        if lord_id in old_map:
-            for col in new_df.columns:
-                if col != "lord_id":
-                    new_val = row[col]
-                    if not pd.isna(new_val):
-                        old_map[lord_id][col] = new_val
-        else:
-            row_dict = {col: 0 for col in old_df.columns if col != "lord_id"}
-            for col in new_df.columns:
-                if col != "lord_id":
-                    row_dict[col] = row[col]
-            old_map[lord_id] = row_dict
-
-    merged = pd.DataFrame.from_dict(old_map, orient="index").reset_index()
-    merged = merged.rename(columns={"index": "lord_id"})
+        new_cols.append(new_col)
+    merged = merge_report(old_df, new_df)
 
     merged = add_merits_percent(merged)
+    merged[NAME_KEY] = merged["name"].map(name_key)
+
+    if progress:
+        progress("write")
+    with ddl_transaction(table_name) as conn:
+        if replace:
+            _swap_table(conn, merged, table_name)
+            conn.execute(text(f"DELETE FROM {reports_table}"))
+        else:
+            _upsert_table(conn, merged, table_name)
+        _write_reports(conn, reports_table, merged, [col for col in report_columns(merged) if col in new_cols])
+        conn.execute(text(f"DELETE FROM {reports_table} WHERE lord_id NOT IN (SELECT lord_id FROM {table_name})"))
+    bump_version(guild_id)
 
-    merged.to_sql(table_name, engine, if_exists="replace", index=False)
-
+    if progress:
+        progress("names")
     update_global_names(guild_id, merged)
 
     return True
 
-def load_players(guild_id):
+def load_players(guild_id, fallback: bool = True):
+    version = data_version(guild_id)
+    cached = snapshot_cache.get(guild_id, version)
+    if cached is not None:
+        return cached
+
     table_name = f"guild_{guild_id}"
     query = f"SELECT * FROM {table_name}"
     try:
-        df = pd.read_sql(query, engine)
-        players_list = df["name"].to_list()
-        return players_list, df
+        df = compact_frame(pd.read_sql(query, engine).drop(columns=NAME_KEY, errors="ignore"))
     except Exception:
+        # callers that cache what they build from the players ask for the error instead
+        if not fallback:
+            raise
         return [], pd.DataFrame()
+    players_list = df["name"].to_list()
+    snapshot_cache.put(guild_id, version, (players_list, df), frame_footprint(df))
+    return players_list, df
     
-def load_previous_kvk(guild_id):
-    table_name = f"guild_{guild_id}_old"
-    inspector = inspect(engine)
-    if not inspector.has_table(table_name):
+def find_player(guild_id: int, lord_id: int | None = None, name: str | None = None) -> dict | None:
+    table_name = f"guild_{guild_id}"
+    if lord_id:
+        query, params = f"SELECT * FROM {table_name} WHERE lord_id = :lord_id", {"lord_id": lord_id}
+    elif name:
+        query, params = f"SELECT * FROM {table_name} WHERE {NAME_KEY} = :key LIMIT 1", {"key": name_key(name)}
+    else:
+        return None
+    with engine.connect() as conn:
+        row = conn.execute(text(query), params).fetchone()
+    if not row:
+        return None
+    player = dict(row._mapping)
+    player.pop(NAME_KEY, None)
+    return player
+
+def load_report_numbers(guild_id: int, suffix: str = "") -> list[int]:
+    table_name = ensure_reports_table(guild_id, suffix)
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            f"SELECT DISTINCT report_no FROM {table_name} WHERE metric = 'power' ORDER BY report_no"
+        )).fetchall()
+    return [row[0] for row in rows]
+
+def load_player_reports(guild_id: int, lord_id: int) -> dict[int, dict[str, int]]:
+    table_name = ensure_reports_table(guild_id)
+    reports = {report_no: {} for report_no in load_report_numbers(guild_id)}
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text(f"SELECT report_no, metric, value FROM {table_name} WHERE lord_id = :lord_id"),
+            {"lord_id": lord_id}
+        ).fetchall()
+    for report_no, metric, value in rows:
+        reports.setdefault(report_no, {})[metric] = value
+    return dict(sorted(reports.items()))
+
+def archived_seasons(guild_id: int) -> list[str]:
+    suffixes = []
+    suffix = "_old"
+    while table_exists(f"guild_{guild_id}{suffix}"):
+        suffixes.append(suffix)
+        suffix = f"_old_{len(suffixes) + 1}"
+    return suffixes
+
+def load_season_totals(guild_id: int, suffix: str = "", min_power: int = 15_000_000) -> dict[str, int] | None:
+    table_name = ensure_reports_table(guild_id, suffix)
+    reports = load_report_numbers(guild_id, suffix)
+    if len(reports) < 2:
+        return None
+    start, end = reports[0], reports[-1]
+    metrics = ", ".join(f"'{metric}'" for metric in SEASON_METRICS)
+    query = f"""
+        SELECT r.metric, r.report_no, SUM(r.value)
+        FROM {table_name} r
+        JOIN {table_name} p
+          ON p.lord_id = r.lord_id AND p.metric = 'power' AND p.report_no = :end AND p.value >= :min_power
+        WHERE r.report_no IN (:start, :end) AND r.metric IN ({metrics})
+        GROUP BY r.metric, r.report_no
+    """
+    with engine.connect() as conn:
+        rows = conn.execute(text(query), {"start": start, "end": end, "min_power": min_power}).fetchall()
+    sums = {(metric, report_no): int(total or 0) for metric, report_no, total in rows}
+    return {
+        "power": sums.get(("power", end), 0),
+        "merits": sums.get(("merits", end), 0),
+        "units_killed": sums.get(("units_killed", end), 0) - sums.get(("units_killed", start), 0),
+        "units_dead": sums.get(("units_dead", end), 0) - sums.get(("units_dead", start), 0),
+    }
+
+def load_previous_kvk(guild_id, season: int = 1):
+    table_name = f"guild_{guild_id}{season_suffix(season)}"
+    if not table_exists(table_name):
         return None
     
     query = f"SELECT * FROM {table_name}"
     old_df = pd.read_sql(query, engine)
-    return old_df
+    return old_df.drop(columns=NAME_KEY, errors="ignore")
+
+def load_season_ids(guild_id: int, season: int = 1) -> pd.DataFrame | None:
+    # mark_new_players only needs the ids, so only those leave the database
+    table_name = f"guild_{guild_id}{season_suffix(season)}"
+    if not table_exists(table_name):
+        return None
+    return pd.read_sql(f"SELECT lord_id FROM {table_name}", engine)
 
 def delete_player(guild_id, player_id, nickname):
     table_name = f"guild_{guild_id}"
+    reports_table = ensure_reports_table(guild_id)
     player = None
     with engine.begin() as conn:
         if nickname:
             result = conn.execute(text(f'SELECT * FROM "{table_name}" WHERE "name" = :name'), {"name": nickname}).fetchone()
             if result:
                 player = dict(result._mapping)
+                conn.execute(
+                    text(f'DELETE FROM "{reports_table}" WHERE "lord_id" IN (SELECT "lord_id" FROM "{table_name}" WHERE "name" = :name)'),
+                    {"name": nickname}
+                )
                 conn.execute(text(f'DELETE FROM "{table_name}" WHERE "name" = :name'), {"name": nickname})
         elif player_id:
             result = conn.execute(text(f'SELECT * FROM "{table_name}" WHERE "lord_id" = :id'), {"id": player_id}).fetchone()
             if result:
                 player = dict(result._mapping)
                 conn.execute(text(f'DELETE FROM "{table_name}" WHERE "lord_id" = :id'), {"id": player_id})
+                conn.execute(text(f'DELETE FROM "{reports_table}" WHERE "lord_id" = :id'), {"id": player_id})
     if player:
+        bump_version(guild_id)
         return f"Player {player.get('name')} removed"
     else:
         return "Player not found"
 
 def update_global_names(guild_id, df: pd.DataFrame):
     table_name = f"names_{guild_id}"
-    with engine.begin() as conn:
+    stage_table = f"names_{guild_id}_stage"
+    names = df[["lord_id", "name"]].dropna(subset=["lord_id"]).drop_duplicates("lord_id", keep="last")
+    names[NAME_KEY] = names["name"].map(name_key)
+
+    with ddl_transaction(table_name) as conn:
         conn.execute(text(f"""
             CREATE TABLE IF NOT EXISTS {table_name} (
                 lord_id BIGINT PRIMARY KEY,
-                name TEXT
+                name TEXT,
+                {NAME_KEY} TEXT
             )
         """))
-    try:
-        global_df = pd.read_sql(f"SELECT * FROM {table_name}", engine)
-    except Exception:
-        global_df = pd.DataFrame(columns=["lord_id", "name"])
-
-    global_map = dict(zip(global_df["lord_id"], global_df["name"]))
-
-    updates = []
-    inserts = []
-
-    for _, row in df.iterrows():
-        lord_id, name = row["lord_id"], row["name"]
-        if lord_id in global_map:
-            if global_map[lord_id] != name:
-                updates.append({"name": name, "lord_id": lord_id})
-        else:
-            inserts.append({"lord_id": lord_id, "name": name})
-
-    if updates:
-        with engine.begin() as conn:
-            for u in updates:
-                conn.execute(
-                    text(f"UPDATE {table_name} SET name = :name WHERE lord_id = :lord_id"),
-                    u
-            )
-
-    if inserts:
-        with engine.begin() as conn:
-            conn.execute(
-                text(f"INSERT INTO {table_name} (lord_id, name) VALUES (:lord_id, :name) "
-                     f"ON CONFLICT(lord_id) DO NOTHING"),
-                inserts    
-            )
+        if NAME_KEY not in {col["name"] for col in inspect(conn).get_columns(table_name)}:
+            _backfill_name_keys(conn, table_name)
+        conn.execute(text(f"DROP TABLE IF EXISTS {stage_table}"))
+        conn.execute(text(f"CREATE TABLE {stage_table} (lord_id BIGINT PRIMARY KEY, name TEXT, {NAME_KEY} TEXT)"))
+        names.to_sql(stage_table, conn, if_exists="append", index=False, chunksize=10_000)
+        conn.execute(text(f"""
+            INSERT INTO {table_name} (lord_id, name, {NAME_KEY})
+            SELECT lord_id, name, {NAME_KEY} FROM {stage_table} WHERE true
+            ON CONFLICT (lord_id) DO UPDATE SET name = EXCLUDED.name, {NAME_KEY} = EXCLUDED.{NAME_KEY}
+            WHERE {table_name}.name IS DISTINCT FROM EXCLUDED.name
+        """))
+        conn.execute(text(f"DROP TABLE {stage_table}"))
     sync_names_with_global(guild_id)
 
 def sync_names_with_global(guild_id: int):
@@ -279,14 +678,17 @@ def sync_names_with_global(guild_id: int):
     global_name_table = f"names_{guild_id}"
 
     try:
-        df = pd.read_sql(f"SELECT * FROM {table_name}", engine)
-        global_df = pd.read_sql(f"SELECT * FROM {global_name_table}", engine)
-    except Exception:
+        with engine.begin() as conn:
+            result = conn.execute(text(f"""
+                UPDATE {table_name} SET name = n.name, {NAME_KEY} = n.{NAME_KEY}
+                FROM {global_name_table} n
+                WHERE {table_name}.lord_id = n.lord_id
+                  AND n.name IS NOT NULL
+                  AND {table_name}.name IS DISTINCT FROM n.name
+            """))
+    except SQLAlchemyError:
         return False
 
-    global_map = dict(zip(global_df["lord_id"], global_df["name"]))
-
-    df["name"] = df["lord_id"].map(global_map).fillna(df["name"])
-
-    df.to_sql(table_name, engine, if_exists="replace", index=False)
-    return True
\ No newline at end of file
+    if result.rowcount:
+        bump_version(guild_id)
+    return True
@@ -0,0 +1,77 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from config import DB_READ_WORKERS, DB_WRITE_WORKERS, GUILD_READ_LIMIT
+from database import data_version, guild_write_lock, load_players, snapshot_cache
+from metrics import REGISTRY, Gauge
+
+# uploads get their own pool so a big ingest never starves read commands
+read_pool = ThreadPoolExecutor(max_workers=DB_READ_WORKERS, thread_name_prefix="db-read")
+write_pool = ThreadPoolExecutor(max_workers=DB_WRITE_WORKERS, thread_name_prefix="db-write")
+
+_write_locks: dict[int, asyncio.Lock] = {}
+_read_slots: dict[int, asyncio.Semaphore] = {}
+_reads_in_flight: dict[tuple, asyncio.Future] = {}
+coalesced_reads = 0
+REGISTRY.append(Gauge(
+    "bot_coalesced_loads", "Guild reads that waited on an identical in-flight read",
+    lambda: [({}, coalesced_reads)]
+))
+
+# run_in_executor does not carry contextvars over, so the metric labels set by
+# the command would be lost on the worker thread
+def _bind(func, *args, **kwargs):
+    return functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+
+async def run_blocking(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(read_pool, _bind(func, *args, **kwargs))
+
+async def run_upload(func, *args, **kwargs):
+    # parsing an upload is part of the ingest, so it runs next to the writes
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(write_pool, _bind(func, *args, **kwargs))
+
+async def _limited_read(guild_id: int, func, *args, **kwargs):
+    # caps the pool connections a single busy guild can hold at once; waiting
+    # here keeps the worker threads free for other guilds
+    slots = _read_slots.setdefault(guild_id, asyncio.Semaphore(GUILD_READ_LIMIT))
+    async with slots:
+        return await run_blocking(func, *args, **kwargs)
+
+async def run_read(guild_id: int, func, *args, **kwargs):
+    # identical reads of the same snapshot share one query
+    global coalesced_reads
+    key = (guild_id, data_version(guild_id), func, args, tuple(sorted(kwargs.items())))
+    future = _reads_in_flight.get(key)
+    if future is None:
+        future = asyncio.ensure_future(_limited_read(guild_id, func, *args, **kwargs))
+        _reads_in_flight[key] = future
+        future.add_done_callback(lambda _: _reads_in_flight.pop(key, None))
+    else:
+        coalesced_reads += 1
+    # a caller that gives up must not cancel the read the others are waiting on
+    return await asyncio.shield(future)
+
+async def run_snapshot_read(guild_id: int, cache, func, *args, **kwargs):
+    # readers built from the guild table wait here on one shared load of it,
+    # so a /rating and an autocomplete burst issue a single SELECT between them
+    version = data_version(guild_id)
+    if cache.get(guild_id, version) is None and snapshot_cache.get(guild_id, version) is None:
+        await run_read(guild_id, load_players, guild_id)
+    return await run_read(guild_id, func, *args, **kwargs)
+
+def _locked_write(guild_id: int, func, *args, **kwargs):
+    with guild_write_lock(guild_id):
+        return func(*args, **kwargs)
+
+async def run_write(guild_id: int, func, *args, **kwargs):
+    lock = _write_locks.setdefault(guild_id, asyncio.Lock())
+    async with lock:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(write_pool, _bind(_locked_write, guild_id, func, *args, **kwargs))
+
+def shutdown() -> None:
+    read_pool.shutdown(wait=False, cancel_futures=True)
+    write_pool.shutdown(wait=True)
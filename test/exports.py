@@ -0,0 +1,180 @@
+import gzip
+import io
+import os
+import pandas as pd
+from openpyxl import Workbook
+from sqlalchemy import text
+from cache import SnapshotCache
+from config import EXPORT_MESSAGE_BYTES, EXPORT_PART_BYTES
+from database import NAME_KEY, cache_budget, data_version, engine, load_players, table_exists
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pa = None
+
+EXPORT_FORMATS = ("xlsx", "csv")
+DUMP_FORMATS = {"csv": "csv.gz", "parquet": "parquet", "arrow": "arrow"}
+DUMP_CHUNK_ROWS = 10_000
+# build_merits_list result for a guild that has no report to rank by yet
+NO_REPORTS = "no_reports"
+
+export_cache = SnapshotCache("exports", cache_budget)
+
+def _xlsx_bytes(header: list[str], rows) -> bytes:
+    # write-only workbooks stream rows straight into the zip instead of keeping cells around
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+def build_merits_list(guild_id: int, min_percent: float, max_percent: float, file_format: str = "xlsx") -> tuple[str, bytes] | str | None:
+    version = data_version(guild_id)
+    entry = export_cache.get(guild_id, version)
+    if entry is None:
+        entry = {}
+    key = (min_percent, max_percent, file_format)
+    if key in entry:
+        return entry[key]
+
+    _, df = load_players(guild_id)
+    if "merits_%" not in df.columns:
+        return NO_REPORTS
+    reports = sorted(
+        {col.split(".")[1] for col in df.columns if col.startswith("power.")},
+        key=int
+    )
+    last = reports[-1]
+    filtered = df[
+        (df["merits_%"] >= min_percent) &
+        (df["merits_%"] <= max_percent) &
+        (df[f"power.{last}"] > 15_000_000)
+    ]
+    if filtered.empty:
+        result = None
+    else:
+        columns = ["name", "merits_%", f"merits.{last}", f"power.{last}"]
+        filtered = filtered.sort_values("merits_%", ascending=False)[columns]
+        filename = f"merits_list_{guild_id}.{file_format}"
+        if file_format == "csv":
+            data = filtered.to_csv(index=False, sep=";").encode("utf-8")
+        else:
+            data = _xlsx_bytes(columns, filtered.itertuples(index=False, name=None))
+        result = (filename, data)
+
+    entry[key] = result
+    export_cache.put(guild_id, version, entry, sum(len(value[1]) for value in entry.values() if value))
+    return result
+
+def _table_chunks(table_name: str):
+    with engine.connect() as conn:
+        conn = conn.execution_options(stream_results=True, max_row_buffer=DUMP_CHUNK_ROWS)
+        query = text(f"SELECT * FROM {table_name} ORDER BY lord_id")
+        for chunk in pd.read_sql(query, conn, chunksize=DUMP_CHUNK_ROWS):
+            yield chunk.drop(columns=NAME_KEY, errors="ignore")
+
+class _CsvPart:
+    def __init__(self, path: str, state: dict) -> None:
+        self.file = open(path, "wb")
+        self.gzip = gzip.GzipFile(fileobj=self.file, mode="wb")
+        self.header = True
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        self.gzip.write(chunk.to_csv(index=False, sep=";", header=self.header).encode("utf-8"))
+        self.gzip.flush()
+        self.header = False
+
+    def size(self) -> int:
+        return self.file.tell()
+
+    def close(self) -> None:
+        self.gzip.close()
+        self.file.close()
+
+class _ArrowPart:
+    def __init__(self, path: str, state: dict) -> None:
+        self.file = open(path, "wb")
+        self.state = state
+        self.writer = None
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        # every part shares the first chunk's schema, later chunks are cast onto it
+        schema = self.state.setdefault("schema", table.schema)
+        table = table.cast(schema)
+        if self.writer is None:
+            if self.state["format"] == "parquet":
+                self.writer = pa.parquet.ParquetWriter(self.file, schema, compression="zstd")
+            else:
+                self.writer = pa.ipc.new_file(self.file, schema, options=pa.ipc.IpcWriteOptions(compression="zstd"))
+        self.writer.write_table(table)
+
+    def size(self) -> int:
+        return self.file.tell()
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+        self.file.close()
+
+def _write_parts(chunks, part_type, state: dict, directory: str, stem: str, extension: str, limit: int) -> list[str]:
+    # a new part starts whenever the next chunk would push the current one past the limit
+    paths = []
+    part = None
+    last_chunk = 0
+    for chunk in chunks:
+        if part is not None and part.size() + last_chunk > limit:
+            part.close()
+            part = None
+        if part is None:
+            paths.append(os.path.join(directory, f"{stem}.part{len(paths) + 1}.{extension}"))
+            part = part_type(paths[-1], state)
+        before = part.size()
+        part.write(chunk)
+        last_chunk = part.size() - before
+    if part is not None:
+        part.close()
+    if len(paths) == 1:
+        single = os.path.join(directory, f"{stem}.{extension}")
+        os.replace(paths[0], single)
+        paths = [single]
+    return paths
+
+def dump_tables(guild_id: int, file_format: str, directory: str, include_old: bool = False,
+                limit: int = EXPORT_PART_BYTES) -> list[str]:
+    if file_format != "csv" and pa is None:
+        raise ValueError(f"{file_format} export needs pyarrow installed")
+    tables = [f"guild_{guild_id}"]
+    if include_old:
+        tables.append(f"guild_{guild_id}_old")
+
+    paths = []
+    for table_name in tables:
+        if not table_exists(table_name):
+            continue
+        part_type = _CsvPart if file_format == "csv" else _ArrowPart
+        state = {"format": file_format}
+        paths += _write_parts(
+            _table_chunks(table_name), part_type, state, directory, table_name, DUMP_FORMATS[file_format], limit
+        )
+    return paths
+
+def batch_parts(paths: list[str], limit: int = EXPORT_MESSAGE_BYTES, max_files: int = 10) -> list[list[str]]:
+    # Discord caps both the attachment count and their total size per message,
+    # a part that is over the limit on its own still goes out alone
+    batches = []
+    total = 0
+    for path in paths:
+        size = os.path.getsize(path)
+        if not batches or len(batches[-1]) == max_files or total + size > limit:
+            batches.append([])
+            total = 0
+        batches[-1].append(path)
+        total += size
+    return batches
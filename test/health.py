@@ -0,0 +1,86 @@
+import asyncio
+import json
+import math
+from database import ping
+from executor import run_blocking
+from jobs import ingest_queue
+from metrics import render
+
+PING_TIMEOUT = 2.0
+READ_TIMEOUT = 5.0
+
+REASONS = {200: "OK", 404: "Not Found", 503: "Service Unavailable"}
+
+class HealthServer:
+    def __init__(self, bot, host: str, port: int) -> None:
+        self.bot = bot
+        self.host = host
+        self.port = port
+        self._server: asyncio.Server | None = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+
+    async def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.close()
+        await self._server.wait_closed()
+        self._server = None
+
+    def gateway_connected(self) -> bool:
+        shards = self.bot.shards.values() if self.bot.is_alive else ()
+        return bool(shards) and all(shard.is_connected for shard in shards)
+
+    async def database_healthy(self) -> bool:
+        try:
+            return await asyncio.wait_for(run_blocking(ping), PING_TIMEOUT)
+        except asyncio.TimeoutError:
+            return False
+
+    async def readiness(self) -> dict:
+        latency = self.bot.heartbeat_latency if self.bot.is_alive else math.nan
+        state = {
+            "gateway": self.gateway_connected(),
+            "database": await self.database_healthy(),
+            "ingest_queue": ingest_queue.depth(),
+            "ingest_running": ingest_queue.running,
+            "heartbeat_ms": None if math.isnan(latency) else round(latency * 1000),
+        }
+        state["ready"] = state["gateway"] and state["database"]
+        return state
+
+    async def _route(self, path: str) -> tuple[int, str, str]:
+        if path == "/":
+            return 200, "text/plain", "Bot is alive"
+        if path == "/health":
+            return 200, "application/json", json.dumps({"alive": self.bot.is_alive})
+        if path == "/ready":
+            state = await self.readiness()
+            return (200 if state["ready"] else 503), "application/json", json.dumps(state)
+        if path == "/metrics":
+            return 200, "text/plain; version=0.0.4", render()
+        return 404, "text/plain", "Not found"
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request = await asyncio.wait_for(reader.readline(), READ_TIMEOUT)
+            while (await asyncio.wait_for(reader.readline(), READ_TIMEOUT)) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request.decode("latin-1").split()
+            path = parts[1].split("?", 1)[0] if len(parts) > 1 else "/"
+            status, content_type, body = await self._route(path)
+            payload = body.encode()
+            writer.write(
+                f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                "Connection: close\r\n\r\n".encode() + payload
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        except Exception as e:
+            print(f"Health check request failed: {e}")
+        finally:
+            writer.close()
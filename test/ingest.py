@@ -0,0 +1,102 @@
+import io
+import hikari
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from config import MAX_UPLOAD_BYTES
+from executor import run_upload
+from schema import resolve_columns, text_dtypes, conform_frame
+
+SUPPORTED_EXTENSIONS = (".csv", ".xlsx", ".xls")
+CSV_CHUNK_ROWS = 10_000
+
+async def read_attachment(attachment: hikari.Attachment, limit: int = MAX_UPLOAD_BYTES) -> io.BytesIO:
+    too_large = f"File is larger than {limit // (1024 * 1024)} MB"
+    if attachment.size > limit:
+        raise ValueError(too_large)
+
+    buffer = io.BytesIO()
+    async with attachment.stream() as reader:
+        async for chunk in reader:
+            if buffer.tell() + len(chunk) > limit:
+                raise ValueError(too_large)
+            buffer.write(chunk)
+    buffer.seek(0)
+    return buffer
+
+def parse_upload(buffer: io.BytesIO, filename: str) -> pd.DataFrame:
+    # the header is read first so only schema columns are parsed, with text columns kept as str
+    if filename.endswith(".csv"):
+        mapping, unknown = resolve_columns(pd.read_csv(buffer, sep=";", encoding="utf-8", nrows=0).columns)
+        buffer.seek(0)
+        chunks = pd.read_csv(
+            buffer, sep=";", encoding="utf-8", chunksize=CSV_CHUNK_ROWS,
+            usecols=list(mapping), dtype=text_dtypes(mapping)
+        )
+        df = pd.concat(chunks, ignore_index=True)
+    elif filename.endswith(".xls"):
+        mapping, unknown = resolve_columns(pd.read_excel(buffer, engine="xlrd", nrows=0).columns)
+        buffer.seek(0)
+        df = pd.read_excel(buffer, engine="xlrd", usecols=list(mapping), dtype=text_dtypes(mapping))
+    else:
+        df, unknown = read_xlsx(buffer, schema=True)
+
+    df.attrs["unknown_columns"] = unknown
+    return conform_frame(df)
+
+def _column_array(values: list) -> np.ndarray:
+    array = np.array(values)
+    if array.dtype.kind in "biuf":
+        return array
+    if all(value is None or (isinstance(value, (int, float)) and not isinstance(value, bool)) for value in values):
+        return np.array(values, dtype=np.float64)
+    return np.array(values, dtype=object)
+
+def read_xlsx(buffer, usecols: set[str] | None = None, schema: bool = False):
+    # read-only mode streams rows instead of building the whole workbook model
+    workbook = load_workbook(buffer, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header_row = next(rows, None)
+        if header_row is None:
+            raise ValueError("The file is empty")
+
+        header = []
+        for i, value in enumerate(header_row):
+            name = str(value) if value is not None else f"Unnamed: {i}"
+            duplicate = 0
+            while (f"{name}.{duplicate}" if duplicate else name) in header:
+                duplicate += 1
+            header.append(f"{name}.{duplicate}" if duplicate else name)
+
+        unknown = []
+        if schema:
+            mapping, unknown = resolve_columns(header)
+            usecols = set(mapping)
+        wanted = [i for i, name in enumerate(header) if usecols is None or name in usecols]
+        columns = {i: [] for i in wanted}
+        width = len(header)
+        for row in rows:
+            if not any(value is not None for value in row):
+                continue
+            if len(row) < width:
+                row = row + (None,) * (width - len(row))
+            for i in wanted:
+                columns[i].append(row[i])
+    finally:
+        workbook.close()
+
+    df = pd.DataFrame({header[i]: _column_array(values) for i, values in columns.items()})
+    return (df, unknown) if schema else df
+
+def unknown_columns_note(df: pd.DataFrame) -> str:
+    unknown = df.attrs.get("unknown_columns")
+    return f"\n⚠️ Ignored unknown columns: {', '.join(unknown)}" if unknown else ""
+
+async def load_attachment(attachment: hikari.Attachment, progress=None) -> pd.DataFrame:
+    if progress:
+        progress("download")
+    buffer = await read_attachment(attachment)
+    if progress:
+        progress("parse")
+    return await run_upload(parse_upload, buffer, attachment.filename)
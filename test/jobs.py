@@ -0,0 +1,124 @@
+import asyncio
+import contextvars
+from collections import deque
+import hikari
+from config import DB_WRITE_WORKERS
+from executor import run_write
+from ingest import load_attachment
+
+STAGES = {
+    "queued": "🕒 Waiting for other uploads to finish...",
+    "download": "⏳ Downloading file...",
+    "parse": "🔍 Reading file...",
+    "archive": "📦 Archiving previous season...",
+    "merge": "🔀 Merging report...",
+    "write": "💾 Writing to database...",
+    "names": "🏷️ Syncing names...",
+}
+
+class IngestJob:
+    def __init__(self, guild_id: int, attachment: hikari.Attachment, save, args: tuple, report) -> None:
+        self.guild_id = guild_id
+        self.attachment = attachment
+        self.save = save
+        self.args = args
+        self.report = report
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.context = contextvars.copy_context()
+        self.updates: list[asyncio.Task] = []
+        self.update_lock = asyncio.Lock()
+
+class IngestQueue:
+    # each guild runs one upload at a time and guilds take turns for the workers,
+    # so a huge kingdom only ever holds a single worker
+    def __init__(self, workers: int) -> None:
+        self.workers = workers
+        self._jobs: dict[int, deque[IngestJob]] = {}
+        self._ready: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+        self.running = 0
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._ready = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for jobs in self._jobs.values():
+            for job in jobs:
+                job.future.cancel()
+        self._jobs.clear()
+
+    def depth(self) -> int:
+        return sum(len(jobs) for jobs in self._jobs.values())
+
+    async def submit(self, guild_id: int, attachment: hikari.Attachment, save, *args, report=None):
+        self.start()
+        job = IngestJob(guild_id, attachment, save, args, report)
+        if guild_id in self._jobs:
+            self._jobs[guild_id].append(job)
+            self._progress(job, "queued")
+        else:
+            self._jobs[guild_id] = deque([job])
+            self._ready.put_nowait(guild_id)
+        return await job.future
+
+    def _progress(self, job: IngestJob, stage: str) -> None:
+        if job.report is None:
+            return
+
+        async def update():
+            async with job.update_lock:
+                try:
+                    await job.report(stage)
+                except hikari.HikariError as e:
+                    print(f"Progress update failed for guild {job.guild_id}: {e}")
+
+        job.updates.append(asyncio.create_task(update()))
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            guild_id = await self._ready.get()
+            job = self._jobs[guild_id].popleft()
+            self.running += 1
+            try:
+                # run under the submitting command's context so metrics keep their labels
+                await job.context.run(loop.create_task, self._run(job, loop))
+            except asyncio.CancelledError:
+                job.future.cancel()
+                raise
+            finally:
+                self.running -= 1
+                if self._jobs[guild_id]:
+                    self._ready.put_nowait(guild_id)
+                else:
+                    del self._jobs[guild_id]
+
+    async def _run(self, job: IngestJob, loop: asyncio.AbstractEventLoop) -> None:
+        def progress(stage: str) -> None:
+            loop.call_soon_threadsafe(self._progress, job, stage)
+
+        try:
+            df = await load_attachment(job.attachment, progress)
+            result = await run_write(job.guild_id, job.save, df, job.guild_id, *job.args, progress=progress)
+        except Exception as e:
+            await self._settle(job)
+            if not job.future.done():
+                job.future.set_exception(e)
+            return
+        await self._settle(job)
+        if not job.future.done():
+            job.future.set_result((df, result))
+
+    async def _settle(self, job: IngestJob) -> None:
+        # let queued progress edits land before the caller writes its final message
+        await asyncio.sleep(0)
+        await asyncio.gather(*job.updates, return_exceptions=True)
+
+ingest_queue = IngestQueue(DB_WRITE_WORKERS)
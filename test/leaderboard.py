@@ -0,0 +1,105 @@
+import bisect
+import numpy as np
+import pandas as pd
+from cache import SnapshotCache, strings_size
+from database import cache_budget, data_version, load_players
+
+CATEGORIES = {"Merits": "merits", "Units Killed": "units_killed", "Units Dead": "units_dead"}
+RATING_PAGE_SIZE = 20
+
+leaderboard_cache = SnapshotCache("leaderboards", cache_budget)
+
+class Leaderboard:
+    # sorted once when the board is built, so any page or rank lookup is cheap
+    def __init__(self, lord_ids: np.ndarray, names: np.ndarray, values: np.ndarray) -> None:
+        self.lord_ids = lord_ids
+        self.names = names
+        self.values = values
+        self.order = np.argsort(-values, kind="stable").astype(np.int32)
+        self.positions = np.empty_like(self.order)
+        self.positions[self.order] = np.arange(len(self.order), dtype=np.int32)
+        self.by_id = np.argsort(lord_ids, kind="stable").astype(np.int32)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + self.order.nbytes + self.positions.nbytes + self.by_id.nbytes
+
+    def pages(self, size: int) -> int:
+        return max(1, -(-len(self.values) // size))
+
+    def clamp_page(self, number: int, size: int) -> int:
+        # 1-based page from the user, 0-based page that exists on the board
+        return min(max(number, 1), self.pages(size)) - 1
+
+    def page(self, number: int, size: int = 20) -> list[tuple[int, str, int]]:
+        start = number * size
+        return [
+            (start + offset + 1, self.names[i], int(self.values[i]))
+            for offset, i in enumerate(self.order[start:start + size])
+        ]
+
+    def top(self, k: int = 20) -> list[tuple[str, int]]:
+        return [(name, value) for _, name, value in self.page(0, k)]
+
+    def _row(self, lord_id: int) -> int | None:
+        at = bisect.bisect_left(self.by_id, lord_id, key=lambda i: self.lord_ids[i])
+        if at == len(self.by_id) or self.lord_ids[self.by_id[at]] != lord_id:
+            return None
+        return int(self.by_id[at])
+
+    def position_of(self, lord_id: int) -> int | None:
+        row = self._row(lord_id)
+        return None if row is None else int(self.positions[row])
+
+    def rank_of(self, lord_id: int) -> int | None:
+        # tied players share a rank: one more than the number of strictly better players
+        row = self._row(lord_id)
+        if row is None:
+            return None
+        return bisect.bisect_left(self.order, -self.values[row], key=lambda i: -self.values[i]) + 1
+
+class GuildLeaderboards:
+    def __init__(self, df: pd.DataFrame) -> None:
+        self.reports = sorted({int(col.split(".")[1]) for col in df.columns if col.startswith("power.")})
+        self.boards: dict[tuple[str, bool], Leaderboard] = {}
+        if not self.reports:
+            self.size = 0
+            return
+
+        first, last = self.reports[0], self.reports[-1]
+        players = df[df["new_player"] != "migrant"]
+        lord_ids = players["lord_id"].to_numpy(dtype=np.int64)
+        names = players["name"].to_numpy(dtype=object)
+        for category, metric in CATEGORIES.items():
+            if f"{metric}.{last}" not in players.columns:
+                continue
+            values = players[f"{metric}.{last}"].fillna(0).to_numpy(dtype=np.int64)
+            self.boards[(category, False)] = Leaderboard(lord_ids, names, values)
+            if metric != "merits" and len(self.reports) > 1 and f"{metric}.{first}" in players.columns:
+                start = players[f"{metric}.{first}"].fillna(0).to_numpy(dtype=np.int64)
+                self.boards[(category, True)] = Leaderboard(lord_ids, names, values - start)
+        self.size = lord_ids.nbytes + names.nbytes + strings_size(names) + sum(board.nbytes for board in self.boards.values())
+
+    @property
+    def season(self) -> bool:
+        return len(self.reports) > 1
+
+    def get(self, category: str, season: bool | None = None) -> Leaderboard | None:
+        if season is None:
+            season = self.season and category != "Merits"
+        return self.boards.get((category, season))
+
+def get_leaderboards(guild_id: int) -> GuildLeaderboards:
+    version = data_version(guild_id)
+    boards = leaderboard_cache.get(guild_id, version)
+    if boards is None:
+        try:
+            _, df = load_players(guild_id, fallback=False)
+        except Exception:
+            return GuildLeaderboards(pd.DataFrame())
+        boards = GuildLeaderboards(df)
+        leaderboard_cache.put(guild_id, version, boards, boards.size)
+    return boards
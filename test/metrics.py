@@ -0,0 +1,132 @@
+import contextvars
+import functools
+import threading
+import time
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+current_command = contextvars.ContextVar("current_command", default="none")
+current_guild = contextvars.ContextVar("current_guild", default="none")
+
+def _label_text(labels: tuple) -> str:
+    return ",".join(f'{key}="{value}"' for key, value in labels)
+
+class Counter:
+    def __init__(self, name: str, help_text: str) -> None:
+        self.name = name
+        self.help_text = help_text
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in self._values.items():
+                lines.append(f"{self.name}{{{_label_text(labels)}}} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: tuple = LATENCY_BUCKETS) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._values: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            counts = self._values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[0][i] += 1
+            counts[1] += value
+            counts[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (buckets, total, count) in self._values.items():
+                prefix = _label_text(labels)
+                prefix = f"{prefix}," if prefix else ""
+                for bound, bucket in zip(self.buckets, buckets):
+                    lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {bucket}')
+                lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+                lines.append(f"{self.name}_sum{{{_label_text(labels)}}} {total}")
+                lines.append(f"{self.name}_count{{{_label_text(labels)}}} {count}")
+        return lines
+
+class Gauge:
+    def __init__(self, name: str, help_text: str, collect) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.collect = collect
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        for labels, value in self.collect():
+            label_text = _label_text(tuple(sorted(labels.items())))
+            lines.append(f"{self.name}{{{label_text}}} {value}" if label_text else f"{self.name} {value}")
+        return lines
+
+command_latency = Histogram("bot_command_duration_seconds", "Slash command latency")
+command_errors = Counter("bot_command_errors_total", "Slash commands that raised")
+sql_latency = Histogram("bot_sql_duration_seconds", "SQL statement latency")
+sql_rows = Counter("bot_sql_rows_total", "Rows returned or affected by SQL statements")
+sql_errors = Counter("bot_sql_errors_total", "SQL statements that raised")
+
+REGISTRY = [command_latency, command_errors, sql_latency, sql_rows, sql_errors]
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+def _sql_labels(statement: str) -> dict:
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+    return {"command": current_command.get(), "guild": current_guild.get(), "operation": operation}
+
+def instrument_engine(engine) -> None:
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        labels = _sql_labels(statement)
+        sql_latency.observe(elapsed, **labels)
+        sql_rows.inc(max(cursor.rowcount, 0), **labels)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
+        sql_errors.inc(**_sql_labels(exception_context.statement or ""))
+
+def instrumented(func):
+    @functools.wraps(func)
+    async def wrapper(self, ctx, *args, **kwargs):
+        command = ctx.interaction.command_name
+        guild = str(ctx.guild_id or "dm")
+        command_token = current_command.set(command)
+        guild_token = current_guild.set(guild)
+        start = time.perf_counter()
+        try:
+            return await func(self, ctx, *args, **kwargs)
+        except Exception:
+            command_errors.inc(command=command, guild=guild)
+            raise
+        finally:
+            command_latency.observe(time.perf_counter() - start, command=command, guild=guild)
+            current_command.reset(command_token)
+            current_guild.reset(guild_token)
+    return wrapper
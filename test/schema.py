@@ -0,0 +1,100 @@
+import pandas as pd
+
+# canonical column -> (dtype, aliases); names are compared after normalize_name
+COLUMNS: dict[str, tuple[str, tuple[str, ...]]] = {
+    "lord_id": ("int", ("id", "player_id", "lordid")),
+    "name": ("str", ("nickname", "player_name", "lord_name")),
+    "alliance_id": ("int", ()),
+    "alliance_tag": ("str", ("alliance", "tag")),
+    "alliance_name": ("str", ()),
+    "faction": ("str", ()),
+    "division": ("str", ()),
+    "new_player": ("str", ()),
+    "power": ("int", ("current_power",)),
+    "highest_power": ("int", ("max_power",)),
+    "merits": ("int", ("merit",)),
+    "units_killed": ("int", ("kills", "killed_units")),
+    "units_dead": ("int", ("dead", "deaths", "dead_units")),
+    "units_healed": ("int", ("healed", "healed_units")),
+    "t1_kill_count": ("int", ("t1_killcount", "t1_kills")),
+    "t2_kill_count": ("int", ("t2_killcount", "t2_kills")),
+    "t3_kill_count": ("int", ("t3_killcount", "t3_kills")),
+    "t4_kill_count": ("int", ("t4_killcount", "t4_kills")),
+    "t5_kill_count": ("int", ("t5_killcount", "t5_kills")),
+    "home_server": ("int", ("server",)),
+    "city_level": ("int", ("city", "city_hall_level")),
+    "defeats": ("int", ()),
+    "victories": ("int", ()),
+    "scouted": ("int", ()),
+    "gold_spent": ("int", ("gold",)),
+    "wood_spent": ("int", ("wood",)),
+    "ore_spent": ("int", ("ore",)),
+    "mana_spent": ("int", ("mana",)),
+    "gems_spent": ("int", ("gems",)),
+    "resources_given": ("int", ("resources",)),
+    "resources_given_count": ("int", ()),
+    "alliance_helps": ("int", ("helps",)),
+}
+
+# low-cardinality text columns, stored as categoricals in cached frames
+CATEGORY_COLUMNS = ("faction", "alliance_tag", "division", "new_player")
+
+def normalize_name(value) -> str:
+    return str(value).strip().lower().replace(" ", "_").replace(".", "_")
+
+_LOOKUP = {
+    normalize_name(alias): name
+    for name, (_, aliases) in COLUMNS.items()
+    for alias in (name, *aliases)
+}
+
+def resolve_columns(headers) -> tuple[dict, list[str]]:
+    mapping = {}
+    unknown = []
+    for header in headers:
+        name = _LOOKUP.get(normalize_name(header))
+        if name is None or name in mapping.values():
+            unknown.append(str(header))
+        else:
+            mapping[header] = name
+    if "lord_id" not in mapping.values():
+        raise ValueError("Missing column: Lord ID")
+    return mapping, unknown
+
+def text_dtypes(mapping: dict) -> dict:
+    return {header: str for header, name in mapping.items() if COLUMNS[name][0] == "str"}
+
+def conform_frame(df: pd.DataFrame) -> pd.DataFrame:
+    mapping, unknown = resolve_columns(df.columns)
+    unknown = list(dict.fromkeys([*df.attrs.get("unknown_columns", []), *unknown]))
+    df = df[list(mapping)].rename(columns=mapping)
+
+    int_cols = [col for col in df.columns if COLUMNS[col][0] == "int"]
+    str_cols = [col for col in df.columns if COLUMNS[col][0] == "str"]
+
+    # only columns that arrived as text need the thousands separators stripped
+    raw = [col for col in int_cols if df[col].dtype == object]
+    if raw:
+        df[raw] = df[raw].replace(r"[^\d]", "", regex=True)
+    for col in int_cols:
+        if df[col].dtype.kind not in "iu":
+            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype("int64")
+    for col in str_cols:
+        df[col] = df[col].fillna("").astype(str)
+
+    df.attrs["unknown_columns"] = unknown
+    return df
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    for col in df.columns:
+        if col in CATEGORY_COLUMNS:
+            df[col] = df[col].astype("category")
+        elif col != "lord_id" and df[col].dtype.kind in "iu":
+            # never below int32, so season differences can't wrap around
+            df[col] = pd.to_numeric(df[col], downcast="integer")
+            if df[col].dtype.itemsize < 4:
+                df[col] = df[col].astype("int32")
+    return df
+
+def frame_footprint(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
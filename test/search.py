@@ -0,0 +1,70 @@
+from bisect import bisect_left, bisect_right
+from unidecode import unidecode
+import sys
+from cache import SnapshotCache, strings_size
+from database import cache_budget, data_version, load_players
+
+index_cache = SnapshotCache("names", cache_budget)
+
+def fold(value: str) -> str:
+    return unidecode(value).lower().replace("\n", " ")
+
+class NameIndex:
+    def __init__(self, names: list[str]) -> None:
+        self.names = [str(name) for name in names]
+        folded = [fold(name) for name in self.names]
+
+        # sorted folded names answer prefix queries with a binary search
+        self._order = sorted(range(len(folded)), key=folded.__getitem__)
+        self._keys = [folded[i] for i in self._order]
+
+        # one joined string lets str.find do substring matching in C
+        self._blob = "\n".join(folded)
+        self._starts = []
+        offset = 0
+        for name in folded:
+            self._starts.append(offset)
+            offset += len(name) + 1
+        self.size = (
+            sys.getsizeof(self._blob) + strings_size(self.names) + strings_size(self._keys)
+            + sum(sys.getsizeof(values) for values in (self.names, self._order, self._keys, self._starts))
+            + sum(sys.getsizeof(value) for value in self._starts)
+        )
+
+    def search(self, query: str, limit: int = 25) -> list[str]:
+        needle = fold(query)
+        if not needle:
+            return self.names[:limit]
+
+        found: list[int] = []
+        seen: set[int] = set()
+
+        i = bisect_left(self._keys, needle)
+        while i < len(self._keys) and len(found) < limit and self._keys[i].startswith(needle):
+            found.append(self._order[i])
+            seen.add(self._order[i])
+            i += 1
+
+        pos = self._blob.find(needle)
+        while pos != -1 and len(found) < limit:
+            idx = bisect_right(self._starts, pos) - 1
+            if idx not in seen:
+                found.append(idx)
+                seen.add(idx)
+            if idx + 1 >= len(self._starts):
+                break
+            pos = self._blob.find(needle, self._starts[idx + 1])
+
+        return [self.names[i] for i in found]
+
+def get_name_index(guild_id: int) -> NameIndex:
+    version = data_version(guild_id)
+    index = index_cache.get(guild_id, version)
+    if index is None:
+        try:
+            names, _ = load_players(guild_id, fallback=False)
+        except Exception:
+            return NameIndex([])
+        index = NameIndex(names)
+        index_cache.put(guild_id, version, index, index.size)
+    return index
@@ -0,0 +1,44 @@
+import sys
+from cache import SnapshotCache, strings_size
+from database import archived_seasons, cache_budget, data_version, load_season_totals
+
+MIN_POWER = 15_000_000
+
+season_cache = SnapshotCache("seasons", cache_budget)
+
+def _entry_size(entry: dict) -> int:
+    size = sys.getsizeof(entry)
+    for key, value in entry.items():
+        size += sys.getsizeof(key) + sys.getsizeof(value)
+        if isinstance(value, dict):
+            size += strings_size(value) + strings_size(value.values())
+        elif isinstance(value, list):
+            size += strings_size(value)
+    return size
+
+def _guild_entry(guild_id: int) -> tuple[int, dict]:
+    version = data_version(guild_id)
+    entry = season_cache.get(guild_id, version)
+    if entry is None:
+        entry = {}
+        season_cache.put(guild_id, version, entry, _entry_size(entry))
+    return version, entry
+
+def _remember(guild_id: int, version: int, entry: dict, key, value) -> None:
+    entry[key] = value
+    # the entry grows as seasons are asked for, so its size is charged again
+    season_cache.put(guild_id, version, entry, _entry_size(entry))
+
+def get_season_totals(guild_id: int, suffix: str = "", min_power: int = MIN_POWER) -> dict[str, int] | None:
+    version, entry = _guild_entry(guild_id)
+    key = (suffix, min_power)
+    if key not in entry:
+        _remember(guild_id, version, entry, key, load_season_totals(guild_id, suffix, min_power))
+    return entry[key]
+
+def compare_seasons(guild_id: int, count: int = 2, min_power: int = MIN_POWER) -> list[tuple[str, dict[str, int] | None]]:
+    version, entry = _guild_entry(guild_id)
+    if "archives" not in entry:
+        _remember(guild_id, version, entry, "archives", archived_seasons(guild_id))
+    suffixes = ["", *entry["archives"][:count - 1]]
+    return [(suffix, get_season_totals(guild_id, suffix, min_power)) for suffix in reversed(suffixes)]
@@ -1,7 +1,7 @@
 import pandas as pd
 import re
-from unidecode import unidecode
-from database import load_players
+from search import get_name_index, index_cache
+from executor import run_snapshot_read
 
 def fmt(value):
     try:
@@ -17,12 +17,9 @@ def visual_len(s: str) -> int:
 async def nickname_autocomplete(ctx):
     current_value: str = ctx.focused.value or ""
     guild_id = ctx.interaction.guild_id
-    pl, _ = load_players(guild_id)
-
-    values_to_recommend = [
-        name for name in pl if unidecode(current_value).lower() in unidecode(name).lower()
-    ]
-    await ctx.respond(values_to_recommend[:25])
+    index = await run_snapshot_read(guild_id, index_cache, get_name_index, guild_id)
+    values_to_recommend = index.search(current_value, 25)
+    await ctx.respond(values_to_recommend)
 
 async def category_autocomplete(ctx):
     current_value: str = ctx.focused.value or ""
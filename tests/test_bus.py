@@ -0,0 +1,95 @@
+import json
+import socket
+import time
+import bus as bus_module
+import database
+from bus import LocalBus, PostgresBus
+from generator import kingdom_export
+from search import get_name_index, index_cache
+
+GUILD_ID = 501
+OTHER_GUILD_ID = 502
+
+def test_local_bus_delivers_between_origins(monkeypatch):
+    database.save_table(kingdom_export(20), GUILD_ID, True)
+    received = []
+    local_bus = LocalBus()
+    local_bus.subscribe(database.ORIGIN, database._on_remote_change, database._on_bus_reset)
+    local_bus.subscribe("other-shard", received.append)
+    monkeypatch.setattr(database, "bus", local_bus)
+
+    version = database.data_version(GUILD_ID)
+    database.bump_version(GUILD_ID)
+    # the other process hears about our write, we don't hear our own echo
+    assert received == [GUILD_ID]
+    assert database.data_version(GUILD_ID) == version + 1
+
+    get_name_index(GUILD_ID)
+    assert index_cache.sizes().get(GUILD_ID) is not None
+    database.schema_registry.has_table(f"guild_{GUILD_ID}")
+    local_bus.publish("other-shard", GUILD_ID)
+    assert database.data_version(GUILD_ID) == version + 2
+    assert index_cache.sizes().get(GUILD_ID) is None
+    assert f"guild_{GUILD_ID}" not in database.schema_registry._tables
+
+class FakeNotify:
+    def __init__(self, payload: str) -> None:
+        self.payload = payload
+
+class FakeConnection:
+    # a socket pair stands in for the psycopg connection so select() works on it
+    def __init__(self, payloads: list[str] | None) -> None:
+        self._reader, self._writer = socket.socketpair()
+        self._writer.send(b"!")
+        self.payloads = payloads
+        self.notifies: list[FakeNotify] = []
+
+    def fileno(self) -> int:
+        return self._reader.fileno()
+
+    def poll(self) -> None:
+        if self.payloads is None:
+            raise OSError("server closed the connection unexpectedly")
+        self._reader.recv(1)
+        self.notifies.extend(FakeNotify(payload) for payload in self.payloads)
+        self.payloads = []
+
+    def close(self) -> None:
+        self._reader.close()
+        self._writer.close()
+
+def wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+def test_postgres_bus_resets_and_dispatches_between_origins(monkeypatch):
+    payloads = [
+        json.dumps({"origin": database.ORIGIN, "guild_id": OTHER_GUILD_ID}),
+        json.dumps({"origin": "other-shard", "guild_id": GUILD_ID}),
+    ]
+    connections = iter([FakeConnection(None), FakeConnection(payloads)])
+    peer = []
+
+    remote_bus = PostgresBus(database.engine)
+    monkeypatch.setattr(remote_bus, "_connect", lambda: next(connections))
+    monkeypatch.setattr(bus_module, "POLL_TIMEOUT", 0.05)
+    remote_bus.subscribe(database.ORIGIN, database._on_remote_change, database._on_bus_reset)
+    remote_bus.subscribe("other-shard", peer.append)
+
+    database.schema_registry.has_table(f"guild_{OTHER_GUILD_ID}")
+    versions = {guild_id: database.data_version(guild_id) for guild_id in (GUILD_ID, OTHER_GUILD_ID)}
+    remote_bus.start()
+    try:
+        # the first connection drops, so everything cached is stale, then the
+        # second one delivers one message from each origin
+        assert wait_for(lambda: peer == [OTHER_GUILD_ID])
+        assert wait_for(lambda: database.data_version(GUILD_ID) == versions[GUILD_ID] + 2)
+    finally:
+        remote_bus.stop()
+
+    assert database.data_version(OTHER_GUILD_ID) == versions[OTHER_GUILD_ID] + 1
+    assert f"guild_{OTHER_GUILD_ID}" not in database.schema_registry._tables
@@ -0,0 +1,41 @@
+from cache import CacheBudget, SnapshotCache
+
+def test_caches_share_one_byte_budget():
+    budget = CacheBudget(1000, 10)
+    players = SnapshotCache("players", budget)
+    names = SnapshotCache("names", budget)
+
+    players.put(1, 0, "a", 400)
+    names.put(1, 0, "b", 400)
+    names.put(2, 0, "c", 400)
+
+    assert budget.total_bytes == 800
+    assert players.get(1, 0) is None
+    assert names.get(1, 0) == "b" and names.get(2, 0) == "c"
+
+def test_entry_limit_is_per_cache():
+    budget = CacheBudget(1000, 2)
+    players = SnapshotCache("players", budget)
+    names = SnapshotCache("names", budget)
+
+    players.put(1, 0, "a", 1)
+    names.put(1, 0, "b", 1)
+    names.put(2, 0, "c", 1)
+    names.put(3, 0, "d", 1)
+
+    assert players.get(1, 0) == "a"
+    assert names.get(1, 0) is None
+    assert sorted(names.sizes()) == [2, 3]
+
+def test_forget_guild_drops_every_cache():
+    budget = CacheBudget(1000, 10)
+    players = SnapshotCache("players", budget)
+    names = SnapshotCache("names", budget)
+
+    players.put(1, 0, "a", 10)
+    names.put(1, 0, "b", 10)
+    names.put(2, 0, "c", 10)
+    budget.forget_guild(1)
+
+    assert budget.sizes() == {("names", 2): 10}
+    assert budget.total_bytes == 10
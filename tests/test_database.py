@@ -0,0 +1,87 @@
+import pandas as pd
+from sqlalchemy import text
+import database
+from generator import kingdom_export
+
+GUILD_ID = 601
+LEGACY_GUILD_ID = 602
+ARCHIVE_GUILD_ID = 603
+
+def test_find_player_folds_non_ascii_names():
+    export = kingdom_export(20)
+    database.save_table(export, GUILD_ID, True)
+    lord_id = int(export["Lord ID"].iloc[5])
+
+    assert database.find_player(GUILD_ID, lord_id=lord_id)["name"] == "Plàyer 5 Ö"
+    assert database.find_player(GUILD_ID, name="plàyer 5 ö")["lord_id"] == lord_id
+    assert database.find_player(GUILD_ID, name="PLÀYER 5 Ö")["lord_id"] == lord_id
+    assert database.find_player(GUILD_ID, name="PLÀYER 55 Ö") is None
+    assert database.NAME_KEY not in database.find_player(GUILD_ID, lord_id=lord_id)
+
+    with database.engine.connect() as conn:
+        plan = conn.execute(text(
+            f"EXPLAIN QUERY PLAN SELECT * FROM guild_{GUILD_ID} WHERE {database.NAME_KEY} = :key LIMIT 1"
+        ), {"key": "plàyer 5 ö"}).fetchall()
+    assert f"ix_guild_{GUILD_ID}_name_key" in plan[0][-1]
+
+def test_renamed_players_are_found_by_their_new_name():
+    export = kingdom_export(20)
+    database.save_table(export, GUILD_ID, True)
+    lord_id = int(export["Lord ID"].iloc[3])
+
+    database.update_global_names(GUILD_ID, pd.DataFrame({"lord_id": [lord_id], "name": ["Ÿvonne"]}))
+    assert database.find_player(GUILD_ID, name="ÿVONNE")["lord_id"] == lord_id
+    assert database.find_player(GUILD_ID, name="Plàyer 3 Á") is None
+
+def test_tables_without_name_keys_are_migrated():
+    table_name = f"guild_{LEGACY_GUILD_ID}"
+    with database.ddl_transaction(table_name) as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {table_name}"))
+        conn.execute(text(f"CREATE TABLE {table_name} (lord_id BIGINT, name TEXT)"))
+        conn.execute(text(f"INSERT INTO {table_name} VALUES (1, 'Ärger'), (2, NULL)"))
+        conn.execute(text(f"CREATE INDEX ix_{table_name}_name_lower ON {table_name} (lower(name))"))
+
+    database.migrate_name_keys()
+    assert database.find_player(LEGACY_GUILD_ID, name="ärger")["lord_id"] == 1
+    with database.engine.connect() as conn:
+        indexes = {row[0] for row in conn.execute(text(
+            f"SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = '{table_name}'"
+        ))}
+    assert indexes == {f"ix_{table_name}_lord_id", f"ix_{table_name}_name_key"}
+
+def test_archive_keeps_the_newest_seasons():
+    keep = database.ARCHIVE_SEASONS
+    seasons = keep + 3
+    exports = {}
+    for season in range(1, seasons + 1):
+        start = kingdom_export(10, report=1, seed=season)
+        end = kingdom_export(10, report=2, seed=season, renamed=0, migrants=0)
+        database.save_table(start, ARCHIVE_GUILD_ID, True)
+        database.save_file_to_db(end, ARCHIVE_GUILD_ID)
+        exports[season] = (start, end)
+
+    assert database.archived_seasons(ARCHIVE_GUILD_ID) == [database.season_suffix(n) for n in range(1, keep + 1)]
+    assert not database.table_exists(f"guild_{ARCHIVE_GUILD_ID}{database.season_suffix(keep + 1)}")
+
+    with database.engine.connect() as conn:
+        indexes = {row[0] for row in conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'"))}
+    for back in range(1, keep + 1):
+        start, end = exports[seasons - back]
+        suffix = database.season_suffix(back)
+        archived = database.load_previous_kvk(ARCHIVE_GUILD_ID, back)
+        assert set(archived["lord_id"]) == set(start["Lord ID"])
+        assert database.NAME_KEY not in archived.columns
+        assert database.load_season_totals(ARCHIVE_GUILD_ID, suffix, min_power=0) == {
+            "power": int(end["Power"].sum()),
+            "merits": int(end["Merits"].sum()),
+            "units_killed": int(end["Units Killed"].sum() - start["Units Killed"].sum()),
+            "units_dead": int(end["Units Dead"].sum() - start["Units Dead"].sum()),
+        }
+        table_name = f"guild_{ARCHIVE_GUILD_ID}{suffix}"
+        assert {f"ix_{table_name}_lord_id", f"ix_{table_name}_name_key"} <= indexes
+
+    # the oldest seasons are gone from every archive
+    for season in range(1, seasons - keep):
+        dropped = set(exports[season][0]["Lord ID"])
+        for back in range(1, keep + 1):
+            assert dropped.isdisjoint(database.load_previous_kvk(ARCHIVE_GUILD_ID, back)["lord_id"])
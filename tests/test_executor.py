@@ -0,0 +1,117 @@
+import asyncio
+import threading
+import time
+import database
+from config import DB_READ_WORKERS, GUILD_READ_LIMIT
+from sqlalchemy import event
+from executor import run_read, run_snapshot_read, run_write
+from exports import build_merits_list, export_cache
+from leaderboard import get_leaderboards, leaderboard_cache
+from search import get_name_index, index_cache
+from generator import kingdom_export
+
+GUILD_ID = 301
+OTHER_GUILD_ID = 302
+SNAPSHOT_GUILD_ID = 303
+TICK = 0.005
+MAX_TICK_LAG = 0.5
+
+async def _sample_ticks(done: asyncio.Event, lags: list[float]) -> None:
+    while not done.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - start - TICK)
+
+async def _save_while_sampling(export) -> tuple[float, list[float]]:
+    done = asyncio.Event()
+    lags: list[float] = []
+    sampler = asyncio.create_task(_sample_ticks(done, lags))
+    start = time.perf_counter()
+    try:
+        await run_write(GUILD_ID, database.save_table, export, GUILD_ID, True)
+    finally:
+        done.set()
+        await sampler
+    return time.perf_counter() - start, lags
+
+def test_large_save_keeps_event_loop_responsive():
+    export = kingdom_export(50_000)
+    elapsed, lags = asyncio.run(_save_while_sampling(export))
+
+    assert database.load_players(GUILD_ID)[1].shape[0] == 50_000
+    # the loop has to keep ticking for the whole save, not just stay alive
+    assert len(lags) >= elapsed / MAX_TICK_LAG
+    assert max(lags) < MAX_TICK_LAG, f"worst tick {max(lags):.3f}s over {elapsed:.1f}s save"
+
+def test_identical_reads_share_one_call():
+    calls = []
+
+    def slow_read(guild_id: int) -> int:
+        calls.append(guild_id)
+        time.sleep(0.1)
+        return len(calls)
+
+    async def main():
+        return await asyncio.gather(*(run_read(GUILD_ID, slow_read, GUILD_ID) for _ in range(5)))
+
+    assert asyncio.run(main()) == [1] * 5
+    assert calls == [GUILD_ID]
+
+def test_busy_guild_waits_without_holding_workers():
+    running = {GUILD_ID: 0, OTHER_GUILD_ID: 0}
+    peak = {GUILD_ID: 0, OTHER_GUILD_ID: 0}
+    lock = threading.Lock()
+
+    def slow_read(guild_id: int, number: int) -> int:
+        with lock:
+            running[guild_id] += 1
+            peak[guild_id] = max(peak[guild_id], running[guild_id])
+        time.sleep(0.1)
+        with lock:
+            running[guild_id] -= 1
+        return number
+
+    async def main():
+        busy = [asyncio.create_task(run_read(GUILD_ID, slow_read, GUILD_ID, number)) for number in range(DB_READ_WORKERS * 2)]
+        await asyncio.sleep(0.02)
+        start = time.perf_counter()
+        # the other guild gets a worker straight away instead of queueing behind the busy one
+        await run_read(OTHER_GUILD_ID, slow_read, OTHER_GUILD_ID, 0)
+        waited = time.perf_counter() - start
+        return await asyncio.gather(*busy), waited
+
+    results, waited = asyncio.run(main())
+    assert results == list(range(DB_READ_WORKERS * 2))
+    assert peak[GUILD_ID] == GUILD_READ_LIMIT
+    assert waited < 0.2
+
+def test_snapshot_readers_share_one_table_load():
+    database.save_table(kingdom_export(200), SNAPSHOT_GUILD_ID, True)
+    database.save_file_to_db(kingdom_export(200, 2), SNAPSHOT_GUILD_ID)
+    for cache in (database.snapshot_cache, leaderboard_cache, index_cache, export_cache):
+        cache.clear()
+    table_loads = []
+
+    def count_loads(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith(f"SELECT * FROM guild_{SNAPSHOT_GUILD_ID}"):
+            table_loads.append(statement)
+
+    async def main():
+        guild_id = SNAPSHOT_GUILD_ID
+        return await asyncio.gather(
+            run_snapshot_read(guild_id, leaderboard_cache, get_leaderboards, guild_id),
+            run_snapshot_read(guild_id, index_cache, get_name_index, guild_id),
+            run_snapshot_read(guild_id, export_cache, build_merits_list, guild_id, 0.0, 100.0, "csv"),
+            run_read(guild_id, database.load_players, guild_id),
+        )
+
+    event.listen(database.engine, "before_cursor_execute", count_loads)
+    try:
+        boards, index, merits, (names, _) = asyncio.run(main())
+    finally:
+        event.remove(database.engine, "before_cursor_execute", count_loads)
+
+    assert len(table_loads) == 1
+    assert boards.reports == [1, 2]
+    assert len(index.names) == len(names)
+    assert merits is None or merits[0].endswith(".csv")
@@ -0,0 +1,49 @@
+import pandas as pd
+import database
+import exports
+from exports import DUMP_FORMATS, NO_REPORTS, batch_parts, build_merits_list, dump_tables, export_cache
+from generator import kingdom_export
+
+MERITS_GUILD_ID = 701
+DUMP_GUILD_ID = 702
+
+def test_merits_list_without_reports():
+    assert build_merits_list(MERITS_GUILD_ID, 0.0, 100.0, "csv") == NO_REPORTS
+    assert export_cache.get(MERITS_GUILD_ID, database.data_version(MERITS_GUILD_ID)) is None
+
+    database.save_table(kingdom_export(30), MERITS_GUILD_ID, True)
+    filename, data = build_merits_list(MERITS_GUILD_ID, 0.0, 100.0, "csv")
+    assert filename == f"merits_list_{MERITS_GUILD_ID}.csv"
+    assert data.decode("utf-8").splitlines()[0] == "name;merits_%;merits.1;power.1"
+
+def test_dump_is_split_into_parts_that_read_back(tmp_path, monkeypatch):
+    monkeypatch.setattr(exports, "DUMP_CHUNK_ROWS", 500)
+    export = kingdom_export(3000)
+    database.save_table(export, DUMP_GUILD_ID, True)
+    for file_format, read in (("csv", lambda path: pd.read_csv(path, sep=";")), ("parquet", pd.read_parquet)):
+        directory = tmp_path / file_format
+        directory.mkdir()
+        paths = dump_tables(DUMP_GUILD_ID, file_format, str(directory), limit=64 * 1024)
+        assert len(paths) > 1
+        assert all(path.endswith(f".part{n}.{DUMP_FORMATS[file_format]}") for n, path in enumerate(paths, 1))
+        parts = [read(path) for path in paths]
+        assert all(not part.empty for part in parts)
+        dumped = pd.concat(parts, ignore_index=True)
+        assert database.NAME_KEY not in dumped.columns
+        assert sorted(dumped["lord_id"]) == sorted(export["Lord ID"])
+        assert set(dumped["name"]) == set(export["Name"])
+
+def test_small_dump_is_a_single_file(tmp_path):
+    database.save_table(kingdom_export(20), DUMP_GUILD_ID, True)
+    paths = dump_tables(DUMP_GUILD_ID, "csv", str(tmp_path))
+    assert paths == [str(tmp_path / f"guild_{DUMP_GUILD_ID}.csv.gz")]
+
+def test_parts_are_batched_by_total_size(tmp_path):
+    paths = []
+    for n, size in enumerate([40, 50, 30, 120, 10, 10]):
+        path = tmp_path / f"part{n}"
+        path.write_bytes(b"x" * size)
+        paths.append(str(path))
+    assert batch_parts(paths, limit=100) == [paths[0:2], paths[2:3], paths[3:4], paths[4:6]]
+    assert batch_parts(paths, limit=1000, max_files=4) == [paths[0:4], paths[4:6]]
+    assert batch_parts([], limit=100) == []
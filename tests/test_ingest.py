@@ -0,0 +1,22 @@
+import asyncio
+import threading
+import ingest
+
+def test_uploads_are_parsed_off_the_read_pool(monkeypatch):
+    threads = []
+
+    async def read_attachment(attachment):
+        return b"Lord ID;Name\n1;Alpha\n"
+
+    def parse_upload(buffer, filename):
+        threads.append(threading.current_thread().name)
+        return filename
+
+    monkeypatch.setattr(ingest, "read_attachment", read_attachment)
+    monkeypatch.setattr(ingest, "parse_upload", parse_upload)
+
+    class Attachment:
+        filename = "report.csv"
+
+    assert asyncio.run(ingest.load_attachment(Attachment())) == "report.csv"
+    assert threads[0].startswith("db-write")
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+from leaderboard import GuildLeaderboards, Leaderboard
+
+def make_players(reports=(1, 2)):
+    df = pd.DataFrame({
+        "lord_id": [10, 11, 12, 13, 14],
+        "name": ["Ann", "Bob", "Cid", "Dan", "Eve"],
+        "new_player": ["", "", "migrant", "new", ""],
+    })
+    first = {"power": [100, 200, 300, 400, 500], "merits": [5, 1, 9, 3, 2],
+             "units_killed": [10, 50, 0, 20, 30], "units_dead": [1, 2, 3, 4, 5]}
+    last = {"power": [110, 210, 310, 410, 510], "merits": [50, 10, 90, 30, 20],
+            "units_killed": [100, 60, 999, 40, 35], "units_dead": [9, 3, 99, 8, 6]}
+    for report, values in zip(reports, (first, last)):
+        for metric, column in values.items():
+            df[f"{metric}.{report}"] = column
+    return df
+
+def test_top_k_is_ordered_by_value():
+    boards = GuildLeaderboards(make_players())
+    assert boards.get("Merits").top(3) == [("Ann", 50), ("Dan", 30), ("Eve", 20)]
+    assert boards.get("Merits").top(10) == [("Ann", 50), ("Dan", 30), ("Eve", 20), ("Bob", 10)]
+
+def test_migrants_are_left_out():
+    boards = GuildLeaderboards(make_players())
+    for board in boards.boards.values():
+        assert len(board) == 4
+        assert "Cid" not in [name for name, _ in board.top(10)]
+        assert board.position_of(12) is None
+
+def test_season_boards_rank_the_difference():
+    boards = GuildLeaderboards(make_players())
+    assert boards.season
+    # killed since the first report: Ann 90, Bob 10, Dan 20, Eve 5
+    assert boards.get("Units Killed").top(4) == [("Ann", 90), ("Dan", 20), ("Bob", 10), ("Eve", 5)]
+    assert boards.get("Units Killed", season=False).top(4) == [("Ann", 100), ("Bob", 60), ("Dan", 40), ("Eve", 35)]
+    assert boards.get("Units Dead").top(1) == [("Ann", 8)]
+
+def test_single_report_uses_absolute_boards():
+    boards = GuildLeaderboards(make_players(reports=(1,)))
+    assert not boards.season
+    assert boards.get("Units Killed").top(2) == [("Bob", 50), ("Eve", 30)]
+    assert boards.get("Units Killed", season=True) is None
+
+def test_merits_never_use_a_season_board():
+    boards = GuildLeaderboards(make_players())
+    assert ("Merits", True) not in boards.boards
+    assert boards.get("Merits") is boards.get("Merits", season=False)
+    assert boards.get("Merits", season=True) is None
+
+def test_no_reports():
+    boards = GuildLeaderboards(pd.DataFrame({"lord_id": [], "name": [], "new_player": []}))
+    assert not boards.reports
+    assert boards.get("Merits") is None
+
+def make_board(values):
+    ids = np.arange(100, 100 + len(values), dtype=np.int64)
+    names = np.array([f"P{i}" for i in range(len(values))], dtype=object)
+    return Leaderboard(ids, names, np.array(values, dtype=np.int64))
+
+def test_ties_share_a_rank_but_keep_positions():
+    board = make_board([5, 9, 5, 7, 5])
+    assert [board.rank_of(i) for i in range(100, 105)] == [3, 1, 3, 2, 3]
+    assert [board.position_of(i) for i in range(100, 105)] == [2, 0, 3, 1, 4]
+    assert [place for place, _, _ in board.page(0, 10)] == [1, 2, 3, 4, 5]
+
+def test_last_page_is_partial():
+    board = make_board(list(range(45, 0, -1)))
+    assert board.pages(20) == 3
+    last = board.page(2, 20)
+    assert [place for place, _, _ in last] == [41, 42, 43, 44, 45]
+    assert last[-1] == (45, "P44", 1)
+    assert board.page(3, 20) == []
+
+def test_unknown_or_migrant_lord_id_has_no_place():
+    board = make_board([3, 2, 1])
+    assert board.position_of(99) is None
+    assert board.rank_of(103) is None
+    boards = GuildLeaderboards(make_players())
+    assert boards.get("Merits").rank_of(12) is None
+    assert boards.get("Merits").position_of(12) is None
+
+def test_page_past_the_end_opens_the_last_page():
+    board = make_board(list(range(45)))
+    assert board.clamp_page(1, 20) == 0
+    assert board.clamp_page(3, 20) == 2
+    assert board.clamp_page(99, 20) == 2
+    assert make_board([]).clamp_page(5, 20) == 0
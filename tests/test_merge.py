@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+from database import merge_report
+
+KEY_COLS = ["lord_id", "name", "alliance_id", "alliance_tag", "faction", "division", "new_player"]
+
+def legacy_merge(old_df: pd.DataFrame, new_df: pd.DataFrame) -> pd.DataFrame:
+    # the row-by-row merge merge_report replaced, kept as the reference behaviour
+    old_map = old_df.set_index("lord_id").to_dict(orient="index")
+    for _, row in new_df.iterrows():
+        lord_id = row["lord_id"]
+        if pd.isna(lord_id):
+            continue
+        if lord_id in old_map:
+            for col in new_df.columns:
+                if col != "lord_id":
+                    new_val = row[col]
+                    if not pd.isna(new_val):
+                        old_map[lord_id][col] = new_val
+        else:
+            row_dict = {col: 0 for col in old_df.columns if col != "lord_id"}
+            for col in new_df.columns:
+                if col != "lord_id":
+                    row_dict[col] = row[col]
+            old_map[lord_id] = row_dict
+    merged = pd.DataFrame.from_dict(old_map, orient="index").reset_index()
+    return merged.rename(columns={"index": "lord_id"})
+
+def assert_same(old_df: pd.DataFrame, new_df: pd.DataFrame) -> pd.DataFrame:
+    expected = legacy_merge(old_df, new_df)
+    merged = merge_report(old_df, new_df)
+    pd.testing.assert_frame_equal(merged, expected, check_dtype=False)
+    return merged
+
+def old_table() -> pd.DataFrame:
+    return pd.DataFrame({
+        "lord_id": [1, 2, 3],
+        "name": ["Alpha", "Beta", "Gamma"],
+        "new_player": ["old", "old", "old"],
+        "power.1": [100, 200, 300],
+        "merits.1": [10, 20, 30],
+    })
+
+def test_nan_never_overwrites():
+    new = pd.DataFrame({
+        "lord_id": [1, 2, 3],
+        "name": ["Alpha", np.nan, "Gamma II"],
+        "power.1": [np.nan, 250.0, np.nan],
+        "merits.2": [11, 21, 31],
+    })
+    merged = assert_same(old_table(), new)
+    assert merged["name"].tolist() == ["Alpha", "Beta", "Gamma II"]
+    assert merged["power.1"].tolist() == [100, 250, 300]
+
+def test_new_players_get_zero_back_columns():
+    new = pd.DataFrame({
+        "lord_id": [2, 4, 5],
+        "name": ["Beta", "Delta", "Epsilon"],
+        "new_player": ["new", "new", "new"],
+        "merits.2": [21, 41, 51],
+    })
+    merged = assert_same(old_table(), new)
+    added = merged[merged["lord_id"].isin([4, 5])]
+    assert (added[["power.1", "merits.1"]] == 0).all().all()
+    assert merged["lord_id"].tolist() == [1, 2, 3, 4, 5]
+
+def test_duplicate_ids_keep_last_non_nan():
+    new = pd.DataFrame({
+        "lord_id": [2, 4, 2, 4, np.nan],
+        "name": ["Beta", "Delta", np.nan, "Delta II", "Nobody"],
+        "merits.2": [21.0, np.nan, 22.0, 42.0, 99.0],
+    })
+    merged = assert_same(old_table(), new)
+    assert merged.set_index("lord_id").loc[2, "merits.2"] == 22
+    assert merged.set_index("lord_id").loc[4, "name"] == "Delta II"
+
+def test_empty_previous_table():
+    new = pd.DataFrame({
+        "lord_id": [7, 8],
+        "name": ["Eta", "Theta"],
+        "alliance_id": [1, 2],
+        "merits.1": [70, 80],
+    })
+    merged = assert_same(pd.DataFrame(columns=KEY_COLS), new)
+    assert (merged[["alliance_tag", "faction", "division", "new_player"]] == 0).all().all()
+
+def test_random_reports_match():
+    rng = np.random.default_rng(0)
+    ids_old = rng.permutation(np.arange(1, 501))
+    old = pd.DataFrame({
+        "lord_id": ids_old,
+        "name": [f"n{i}" for i in ids_old],
+        "new_player": "old",
+        "power.1": rng.integers(0, 10**8, 500),
+        "merits.1": rng.integers(0, 10**6, 500),
+    })
+    ids_new = rng.permutation(np.arange(250, 850))
+    new = pd.DataFrame({
+        "lord_id": ids_new,
+        "name": [f"m{i}" for i in ids_new],
+        "new_player": "new",
+        "power.2": rng.integers(0, 10**8, 600).astype(float),
+        "merits.2": rng.integers(0, 10**6, 600),
+    })
+    new.loc[new.sample(frac=0.2, random_state=1).index, "power.2"] = np.nan
+    new.loc[new.sample(frac=0.1, random_state=2).index, "name"] = np.nan
+    assert_same(old, new)
+
+# known differences from the old loop
+
+def test_all_nan_column_is_kept():
+    # the old loop never wrote a NaN onto a known player, so a column that was
+    # empty for everyone vanished; merge_report keeps it
+    new = pd.DataFrame({"lord_id": [1, 2], "merits.2": [np.nan, np.nan]})
+    assert "merits.2" not in legacy_merge(old_table(), new).columns
+    merged = merge_report(old_table(), new)
+    assert merged["merits.2"].isna().all()
+    pd.testing.assert_frame_equal(merged.drop(columns="merits.2"), legacy_merge(old_table(), new), check_dtype=False)
+
+def test_new_columns_follow_report_order():
+    # the old loop ordered columns by the first row that carried a value for
+    # them; merge_report appends them in the order the report lists them
+    new = pd.DataFrame({
+        "lord_id": [1, 2],
+        "power.2": [np.nan, 201.0],
+        "merits.2": [11, 21],
+    })
+    expected = legacy_merge(old_table(), new)
+    merged = merge_report(old_table(), new)
+    assert expected.columns[-2:].tolist() == ["merits.2", "power.2"]
+    assert merged.columns[-2:].tolist() == ["power.2", "merits.2"]
+    pd.testing.assert_frame_equal(merged[expected.columns], expected, check_dtype=False)
@@ -0,0 +1,34 @@
+from search import NameIndex
+
+NAMES = ["Zed Ångström", "Ángel", "Bob", "angela", "Mangler", "Anglo Saxon", "ÄNGST"]
+
+def test_prefix_hits_come_before_substring_hits():
+    # prefix hits in folded order, then the rest in table order
+    assert NameIndex(NAMES).search("ang") == ["Ángel", "angela", "Anglo Saxon", "ÄNGST", "Zed Ångström", "Mangler"]
+
+def test_limit_is_respected():
+    index = NameIndex(NAMES)
+    assert index.search("ang", 2) == ["Ángel", "angela"]
+    assert index.search("ang", 5) == ["Ángel", "angela", "Anglo Saxon", "ÄNGST", "Zed Ångström"]
+
+def test_accents_and_case_are_folded():
+    index = NameIndex(NAMES)
+    assert index.search("ÅNGSTRÖM") == ["Zed Ångström"]
+    assert index.search("angst") == ["ÄNGST", "Zed Ångström"]
+    assert index.search("BOB") == ["Bob"]
+
+def test_names_are_listed_once():
+    index = NameIndex(["Anna", "Hannah Anna", "Anna"])
+    hits = index.search("anna")
+    assert sorted(hits) == ["Anna", "Anna", "Hannah Anna"]
+    assert len(hits) == 3
+    assert index.search("an") == ["Anna", "Anna", "Hannah Anna"]
+
+def test_empty_query_lists_the_first_names():
+    index = NameIndex(NAMES)
+    assert index.search("") == NAMES
+    assert index.search("", 3) == NAMES[:3]
+
+def test_no_match():
+    assert NameIndex(NAMES).search("xyz") == []
+    assert NameIndex([]).search("a") == []